@@ -1,213 +1,340 @@
-from flask import Flask, request, jsonify, send_from_directory, session, redirect, url_for
+from flask import Blueprint, Flask, Response, request, jsonify, session, redirect, url_for
 from flask_cors import CORS
 from functools import wraps
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import hmac
 import os
+import json
+import queue
+import threading
+import time
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 import database as db
+import scraper
 
 # Get absolute path to static folder
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(BASE_DIR, 'static')
 
 app = Flask(__name__, static_folder=STATIC_DIR)
+# Let browsers cache static assets; the index shell below opts out so it
+# always revalidates (cheap 304s thanks to send_from_directory's ETag).
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.permanent_session_lifetime = timedelta(days=30)
 CORS(app)
 
-# Simple password protection
+# Compress JSON/HTML responses (brotli preferred, gzip fallback)
+try:
+    from flask_compress import Compress
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_LEVEL'] = 4
+    app.config['COMPRESS_MIN_SIZE'] = 512
+    Compress(app)
+except ImportError:
+    pass
+
+if orjson is not None:
+    from flask.json.provider import JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """Serialize responses with orjson - markedly faster than stdlib json
+        on the row-heavy list endpoints. Falls back to Flask's default
+        provider when orjson isn't installed."""
+
+        def dumps(self, obj, **kwargs):
+            # OPT_NON_STR_KEYS: orjson otherwise refuses dicts keyed by
+            # ints, which the check-all-prices error map uses (item_id)
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
+# Simple password protection. Resolve the env var once: handlers check a
+# plain module constant instead of re-reading the environment, and the
+# password is pre-encoded for the constant-time compare in login().
 APP_PASSWORD = os.environ.get('APP_PASSWORD', '')  # Set in environment for production
+AUTH_DISABLED = not APP_PASSWORD
+_APP_PASSWORD_BYTES = APP_PASSWORD.encode('utf-8')
+
+def _auth_check():
+    """Return a response if the request is unauthenticated, else None"""
+    # Skip auth if no password is set
+    if AUTH_DISABLED:
+        return None
+    if not session.get('authenticated'):
+        if request.is_json:
+            return jsonify({'error': 'Unauthorized'}), 401
+        return redirect(url_for('login_page'))
+    return None
 
 def require_auth(f):
+    # Async views need an async wrapper so Flask still awaits them
+    if asyncio.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated(*args, **kwargs):
+            denied = _auth_check()
+            if denied is not None:
+                return denied
+            return await f(*args, **kwargs)
+        return decorated
+
     @wraps(f)
     def decorated(*args, **kwargs):
-        # Skip auth if no password is set
-        if not APP_PASSWORD:
-            return f(*args, **kwargs)
-        if not session.get('authenticated'):
-            if request.is_json:
-                return jsonify({'error': 'Unauthorized'}), 401
-            return redirect(url_for('login_page'))
+        denied = _auth_check()
+        if denied is not None:
+            return denied
         return f(*args, **kwargs)
     return decorated
 
+# In-process cache for GET responses. Everything invalidates together on any
+# write, which is cheap at this scale and keeps the invalidation logic simple.
+# The TTL is deliberately short: invalidation is per-process, and with
+# gunicorn running two workers a write handled by one worker can't drop the
+# other's entries - the TTL bounds how long the other worker serves the
+# pre-write response.
+CACHE_TTL = 5  # seconds
+_response_cache = {}
+_cache_lock = threading.Lock()
+
+def cached_json(view):
+    """Cache a GET view's JSON body and serve 304s via ETag/If-None-Match"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.full_path
+        now = time.monotonic()
+        with _cache_lock:
+            entry = _response_cache.get(key)
+        if entry and now < entry[0]:
+            body, etag = entry[1], entry[2]
+        else:
+            resp = view(*args, **kwargs)
+            body = resp.get_data()
+            etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+            with _cache_lock:
+                _response_cache[key] = (now + CACHE_TTL, body, etag)
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers={'ETag': etag})
+        return Response(body, mimetype='application/json', headers={'ETag': etag})
+    return wrapper
+
+def request_body():
+    """Parse the JSON request body with orjson, skipping Flask's body cache.
+
+    A missing or malformed body yields {} so handlers fall through to
+    their own field validation instead of paying exception unwinding for
+    a BadRequest raise on every bad payload.
+    """
+    raw = request.get_data(cache=False)
+    if not raw:
+        return {}
+    try:
+        parsed = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+def invalidate_cache():
+    """Drop all cached GET responses after a write"""
+    with _cache_lock:
+        _response_cache.clear()
+
+# Background executor for scrapes kicked off from request handlers, plus a
+# small job table clients can poll. Finished jobs are pruned on lookup.
+executor = ThreadPoolExecutor(max_workers=8)
+jobs = {}
+
+# SSE subscribers: one Queue per connected client
+subscribers = set()
+_subscribers_lock = threading.Lock()
+
+def publish_event(event):
+    """Push an event dict to every connected /api/events client"""
+    with _subscribers_lock:
+        targets = list(subscribers)
+    for q in targets:
+        q.put(event)
+
+def _check_item_price(item_id, url):
+    """Scrape one item's price and record it; runs on the executor"""
+    info = scraper.scrape_whole_foods_price(url)
+    if info.price is not None:
+        db.add_price_record(item_id, info.price, info.regular_price, info.on_sale)
+        invalidate_cache()
+        publish_event({'type': 'price', 'item_id': item_id,
+                       'price': info.price, 'on_sale': info.on_sale})
+    return {
+        'item_id': item_id,
+        'price': info.price,
+        'regular_price': info.regular_price,
+        'on_sale': info.on_sale,
+        'product_name': info.product_name,
+        'error': info.error,
+    }
+
 # Initialize database on startup
 db.init_db()
 
+# The login page is static HTML; build both variants once at import so each
+# request serves pre-encoded bytes instead of re-encoding a 2KB literal.
+_LOGIN_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head>
+    <title>Login - Grocery Tracker</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
+            min-height: 100vh;
+            background: linear-gradient(135deg, #1a5f2a 0%, #2d8f4e 100%);
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            font-family: system-ui, -apple-system, sans-serif;
+        }
+        .login-box {
+            background: white;
+            padding: 40px;
+            border-radius: 16px;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+            width: 90%;
+            max-width: 400px;
+        }
+        h1 { color: #1a5f2a; margin-bottom: 10px; }
+        p { color: #666; margin-bottom: 25px; }
+        input {
+            width: 100%;
+            padding: 15px;
+            border: 2px solid #e0e0e0;
+            border-radius: 8px;
+            font-size: 16px;
+            margin-bottom: 15px;
+        }
+        input:focus { outline: none; border-color: #1a5f2a; }
+        button {
+            width: 100%;
+            padding: 15px;
+            background: #1a5f2a;
+            color: white;
+            border: none;
+            border-radius: 8px;
+            font-size: 16px;
+            cursor: pointer;
+        }
+        button:hover { background: #15501f; }
+        .error { color: #e74c3c; margin-bottom: 15px; font-size: 14px; }
+    </style>
+</head>
+<body>
+    <div class="login-box">
+        <h1>Grocery Tracker</h1>
+        <p>Enter the password to continue</p>
+        __ERROR__<form method="POST" action="/login" autocomplete="on">
+            <input type="text" name="username" value="user" autocomplete="username" style="display:none;">
+            <input type="password" name="password" placeholder="Password" autocomplete="current-password" autofocus required>
+            <button type="submit">Login</button>
+        </form>
+    </div>
+</body>
+</html>
+'''
+
+_LOGIN_HTML = _LOGIN_TEMPLATE.replace('__ERROR__', '').encode('utf-8')
+_LOGIN_ERROR_HTML = _LOGIN_TEMPLATE.replace(
+    '__ERROR__',
+    '<p class="error">Incorrect password. Please try again.</p>\n        '
+).encode('utf-8')
+_LOGIN_ETAG = hashlib.blake2b(_LOGIN_HTML, digest_size=8).hexdigest()
+
 @app.route('/login', methods=['GET'])
 def login_page():
-    if not APP_PASSWORD or session.get('authenticated'):
+    if AUTH_DISABLED or session.get('authenticated'):
         return redirect(url_for('index'))
-    return '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Login - Grocery Tracker</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body {
-                min-height: 100vh;
-                background: linear-gradient(135deg, #1a5f2a 0%, #2d8f4e 100%);
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                font-family: system-ui, -apple-system, sans-serif;
-            }
-            .login-box {
-                background: white;
-                padding: 40px;
-                border-radius: 16px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                width: 90%;
-                max-width: 400px;
-            }
-            h1 { color: #1a5f2a; margin-bottom: 10px; }
-            p { color: #666; margin-bottom: 25px; }
-            input {
-                width: 100%;
-                padding: 15px;
-                border: 2px solid #e0e0e0;
-                border-radius: 8px;
-                font-size: 16px;
-                margin-bottom: 15px;
-            }
-            input:focus { outline: none; border-color: #1a5f2a; }
-            button {
-                width: 100%;
-                padding: 15px;
-                background: #1a5f2a;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                font-size: 16px;
-                cursor: pointer;
-            }
-            button:hover { background: #15501f; }
-            .error { color: #e74c3c; margin-bottom: 15px; font-size: 14px; }
-        </style>
-    </head>
-    <body>
-        <div class="login-box">
-            <h1>Grocery Tracker</h1>
-            <p>Enter the password to continue</p>
-            <form method="POST" action="/login" autocomplete="on">
-                <input type="text" name="username" value="user" autocomplete="username" style="display:none;">
-                <input type="password" name="password" placeholder="Password" autocomplete="current-password" autofocus required>
-                <button type="submit">Login</button>
-            </form>
-        </div>
-    </body>
-    </html>
-    '''
+    if request.headers.get('If-None-Match') == _LOGIN_ETAG:
+        return Response(status=304, headers={'ETag': _LOGIN_ETAG})
+    return Response(_LOGIN_HTML, mimetype='text/html',
+                    headers={'ETag': _LOGIN_ETAG, 'Cache-Control': 'public, max-age=300'})
 
 @app.route('/login', methods=['POST'])
 def login():
     password = request.form.get('password', '')
-    if password == APP_PASSWORD:
+    if AUTH_DISABLED or hmac.compare_digest(password.encode('utf-8'), _APP_PASSWORD_BYTES):
         session.permanent = True
         session['authenticated'] = True
         return redirect(url_for('index'))
-    return '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Login - Grocery Tracker</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body {
-                min-height: 100vh;
-                background: linear-gradient(135deg, #1a5f2a 0%, #2d8f4e 100%);
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                font-family: system-ui, -apple-system, sans-serif;
-            }
-            .login-box {
-                background: white;
-                padding: 40px;
-                border-radius: 16px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                width: 90%;
-                max-width: 400px;
-            }
-            h1 { color: #1a5f2a; margin-bottom: 10px; }
-            p { color: #666; margin-bottom: 25px; }
-            input {
-                width: 100%;
-                padding: 15px;
-                border: 2px solid #e0e0e0;
-                border-radius: 8px;
-                font-size: 16px;
-                margin-bottom: 15px;
-            }
-            input:focus { outline: none; border-color: #1a5f2a; }
-            button {
-                width: 100%;
-                padding: 15px;
-                background: #1a5f2a;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                font-size: 16px;
-                cursor: pointer;
-            }
-            button:hover { background: #15501f; }
-            .error { color: #e74c3c; margin-bottom: 15px; font-size: 14px; }
-        </style>
-    </head>
-    <body>
-        <div class="login-box">
-            <h1>Grocery Tracker</h1>
-            <p>Enter the password to continue</p>
-            <p class="error">Incorrect password. Please try again.</p>
-            <form method="POST" action="/login" autocomplete="on">
-                <input type="text" name="username" value="user" autocomplete="username" style="display:none;">
-                <input type="password" name="password" placeholder="Password" autocomplete="current-password" autofocus required>
-                <button type="submit">Login</button>
-            </form>
-        </div>
-    </body>
-    </html>
-    ''', 401
+    return Response(_LOGIN_ERROR_HTML, status=401, mimetype='text/html')
 
 @app.route('/logout')
 def logout():
     session.pop('authenticated', None)
     return redirect(url_for('login_page'))
 
+# Read the SPA shell into memory once; serving it needs no stat/open per
+# request and revalidations hit the strong ETag below.
+with open(os.path.join(STATIC_DIR, 'index.html'), 'rb') as f:
+    INDEX_HTML = f.read()
+INDEX_ETAG = hashlib.blake2b(INDEX_HTML, digest_size=8).hexdigest()
+
 @app.route('/')
 @require_auth
 def index():
-    return send_from_directory(STATIC_DIR, 'index.html')
+    if request.headers.get('If-None-Match') == INDEX_ETAG:
+        return Response(status=304, headers={'ETag': INDEX_ETAG})
+    return Response(INDEX_HTML, mimetype='text/html',
+                    headers={'ETag': INDEX_ETAG, 'Cache-Control': 'no-cache'})
+
+# All JSON endpoints live on one blueprint, registered once below
+api = Blueprint('api', __name__, url_prefix='/api')
 
-@app.route('/api/items', methods=['GET'])
+@api.route('/items', methods=['GET'])
 @require_auth
+@cached_json
 def get_items():
-    """Get all items"""
-    items = db.get_all_items()
+    """Get all items; optional ?limit=&offset= paginate the response"""
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', default=0, type=int)
+    # Negative values would reach SQL (Postgres rejects a negative
+    # LIMIT) or slice the snapshot from the wrong end; treat them as
+    # absent rather than erroring
+    if limit is not None and limit < 0:
+        limit = None
+    if offset < 0:
+        offset = 0
+    items = db.get_all_items(limit=limit, offset=offset)
     return jsonify(items)
 
-@app.route('/api/items/on-list', methods=['GET'])
+@api.route('/items/on-list', methods=['GET'])
 @require_auth
+@cached_json
 def get_items_on_list():
     """Get items currently on shopping list"""
     items = db.get_items_on_list()
     return jsonify(items)
 
-@app.route('/api/items/frequent', methods=['GET'])
+@api.route('/items/frequent', methods=['GET'])
 @require_auth
+@cached_json
 def get_frequent_items():
     """Get frequently purchased items not on list"""
     items = db.get_frequent_items()
     return jsonify(items)
 
-@app.route('/api/items', methods=['POST'])
+@api.route('/items', methods=['POST'])
 @require_auth
 def add_item():
     """Add a new grocery item to the list"""
-    data = request.json
+    data = request_body()
     name = (data.get('name') or '').strip()
     whole_foods_url = (data.get('whole_foods_url') or '').strip() or None
     image_url = (data.get('image_url') or '').strip() or None
@@ -227,14 +354,19 @@ def add_item():
             db.add_price_record(item_id, price, price, False)
         except (ValueError, TypeError):
             pass
+    elif whole_foods_url:
+        # Fetch the first price off the request path so the add returns
+        # immediately; clients see it via price-history or a later refresh
+        executor.submit(_check_item_price, item_id, whole_foods_url)
 
+    invalidate_cache()
     return jsonify({'id': item_id, 'message': 'Item added'}), 201
 
-@app.route('/api/items/<int:item_id>', methods=['PUT'])
+@api.route('/items/<int:item_id>', methods=['PUT'])
 @require_auth
 def update_item(item_id):
     """Update item details"""
-    data = request.json
+    data = request_body()
     db.update_item(
         item_id,
         name=data.get('name'),
@@ -243,20 +375,22 @@ def update_item(item_id):
         on_list=data.get('on_list'),
         notes=data.get('notes')
     )
+    invalidate_cache()
     return jsonify({'message': 'Item updated'})
 
-@app.route('/api/items/<int:item_id>', methods=['DELETE'])
+@api.route('/items/<int:item_id>', methods=['DELETE'])
 @require_auth
 def delete_item(item_id):
     """Delete an item permanently"""
     db.delete_item(item_id)
+    invalidate_cache()
     return jsonify({'message': 'Item deleted'})
 
-@app.route('/api/items/<int:item_id>/bought', methods=['POST'])
+@api.route('/items/<int:item_id>/bought', methods=['POST'])
 @require_auth
 def mark_bought(item_id):
     """Mark item as bought - records purchase and removes from list"""
-    data = request.json or {}
+    data = request_body()
     price = data.get('price')
     on_sale = data.get('on_sale', False)
     user_id = data.get('user_id')
@@ -268,29 +402,32 @@ def mark_bought(item_id):
             price = None
 
     db.record_purchase(item_id, price, on_sale, user_id)
+    invalidate_cache()
     return jsonify({'message': 'Purchase recorded'})
 
-@app.route('/api/items/<int:item_id>/add-to-list', methods=['POST'])
+@api.route('/items/<int:item_id>/add-to-list', methods=['POST'])
 @require_auth
 def add_to_list(item_id):
     """Add item back to shopping list"""
     db.add_to_list(item_id)
+    invalidate_cache()
     return jsonify({'message': 'Added to list'})
 
-@app.route('/api/items/<int:item_id>/not-available', methods=['POST'])
+@api.route('/items/<int:item_id>/not-available', methods=['POST'])
 @require_auth
 def mark_not_available(item_id):
     """Mark item as not available - keeps on list but records timestamp"""
-    data = request.json or {}
+    data = request_body()
     user_id = data.get('user_id')
     db.record_not_available(item_id, user_id)
+    invalidate_cache()
     return jsonify({'message': 'Marked as not available'})
 
-@app.route('/api/items/<int:item_id>/price', methods=['POST'])
+@api.route('/items/<int:item_id>/price', methods=['POST'])
 @require_auth
 def update_price(item_id):
     """Update price for an item"""
-    data = request.json
+    data = request_body()
     price = data.get('price')
     on_sale = data.get('on_sale', False)
 
@@ -303,129 +440,237 @@ def update_price(item_id):
         return jsonify({'error': 'Invalid price'}), 400
 
     db.add_price_record(item_id, price, price, on_sale)
+    invalidate_cache()
+    publish_event({'type': 'price', 'item_id': item_id, 'price': price, 'on_sale': on_sale})
     return jsonify({'message': 'Price updated'})
 
-@app.route('/api/items/<int:item_id>/purchases', methods=['GET'])
+@api.route('/items/<int:item_id>/check-price', methods=['POST'])
+@require_auth
+def check_item_price(item_id):
+    """Kick off a background price check - returns a job id to poll"""
+    item = db.get_item(item_id)
+    if not item:
+        return jsonify({'error': 'Item not found'}), 404
+    if not item.get('whole_foods_url'):
+        return jsonify({'error': 'Item has no Whole Foods URL'}), 400
+
+    job_id = uuid.uuid4().hex
+    jobs[job_id] = executor.submit(_check_item_price, item_id, item['whole_foods_url'])
+    return jsonify({'job_id': job_id}), 202
+
+@api.route('/events', methods=['GET'])
 @require_auth
+def events():
+    """SSE stream of price updates - replaces client polling.
+
+    Subscriptions are process-local: with more than one gunicorn worker
+    a client only sees events published by the worker it connected to.
+    """
+    q = queue.Queue()
+    with _subscribers_lock:
+        subscribers.add(q)
+
+    def stream():
+        try:
+            while True:
+                try:
+                    event = q.get(timeout=15)
+                except queue.Empty:
+                    # Periodic keepalive comment: writing to a client
+                    # that went away fails here, closing the generator
+                    # and freeing the worker thread - a bare q.get()
+                    # would pin it until the next event fires
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            with _subscribers_lock:
+                subscribers.discard(q)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_job(job_id):
+    """Poll a background job started by check-price"""
+    future = jobs.get(job_id)
+    if future is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not future.done():
+        return jsonify({'state': 'pending'})
+    jobs.pop(job_id, None)
+    try:
+        return jsonify({'state': 'done', 'result': future.result()})
+    except Exception as e:
+        return jsonify({'state': 'error', 'error': str(e)})
+
+@api.route('/check-all-prices', methods=['POST'])
+@require_auth
+async def check_all_prices():
+    """Re-scrape prices for every item with a Whole Foods URL"""
+    items = await db.get_items_with_urls_async()
+    try:
+        import aiohttp  # noqa: F401
+        results = await scraper.check_all_prices_async(items)
+    except ImportError:
+        # Fall back to the thread-pool path if aiohttp isn't installed
+        results = await asyncio.to_thread(scraper.check_all_prices, items)
+
+    # SQLite calls stay sync; run them off the event loop. Collect the
+    # successful scrapes and insert them in one transaction.
+    records = []
+    errors = {}
+    for item_id, info in results.items():
+        if info.price is not None:
+            records.append((item_id, info.price, info.regular_price, info.on_sale))
+        elif info.error:
+            errors[item_id] = info.error
+    await db.add_price_records_bulk_async(records)
+    for item_id, price, _, on_sale in records:
+        publish_event({'type': 'price', 'item_id': item_id,
+                       'price': price, 'on_sale': on_sale})
+    updated = len(records)
+    invalidate_cache()
+    return jsonify({'checked': len(results), 'updated': updated, 'errors': errors})
+
+@api.route('/items/<int:item_id>/purchases', methods=['GET'])
+@require_auth
+@cached_json
 def get_purchase_history(item_id):
     """Get purchase history for an item"""
     history = db.get_purchase_history(item_id)
     return jsonify(history)
 
-@app.route('/api/items/<int:item_id>/price-history', methods=['GET'])
+@api.route('/items/<int:item_id>/price-history', methods=['GET'])
 @require_auth
+@cached_json
 def get_price_history(item_id):
     """Get price history for an item"""
     history = db.get_price_history(item_id)
     return jsonify(history)
 
 # User endpoints
-@app.route('/api/users', methods=['GET'])
+@api.route('/users', methods=['GET'])
 @require_auth
+@cached_json
 def get_users():
     """Get all users"""
     users = db.get_all_users()
     return jsonify(users)
 
-@app.route('/api/users', methods=['POST'])
+@api.route('/users', methods=['POST'])
 @require_auth
 def create_user():
     """Create a new user"""
-    data = request.json
+    data = request_body()
     name = data.get('name', '').strip()
     if not name:
         return jsonify({'error': 'User name is required'}), 400
     try:
         user_id = db.add_user(name)
+        invalidate_cache()
         return jsonify({'id': user_id, 'message': 'User created'}), 201
     except Exception as e:
         return jsonify({'error': 'User already exists'}), 400
 
-@app.route('/api/users/<int:user_id>', methods=['DELETE'])
+@api.route('/users/<int:user_id>', methods=['DELETE'])
 @require_auth
 def remove_user(user_id):
     """Delete a user"""
     db.delete_user(user_id)
+    invalidate_cache()
     return jsonify({'message': 'User deleted'})
 
-@app.route('/api/users/<int:user_id>', methods=['PUT'])
+@api.route('/users/<int:user_id>', methods=['PUT'])
 @require_auth
 def update_user(user_id):
     """Update a user name"""
-    data = request.json
+    data = request_body()
     name = data.get('name', '').strip()
     if not name:
         return jsonify({'error': 'User name is required'}), 400
     db.update_user(user_id, name)
+    invalidate_cache()
     return jsonify({'message': 'User updated'})
 
 # Store endpoints
-@app.route('/api/stores', methods=['GET'])
+@api.route('/stores', methods=['GET'])
 @require_auth
+@cached_json
 def get_stores():
     """Get all stores"""
     stores = db.get_all_stores()
     return jsonify(stores)
 
-@app.route('/api/stores', methods=['POST'])
+@api.route('/stores', methods=['POST'])
 @require_auth
 def create_store():
     """Create a new store"""
-    data = request.json
+    data = request_body()
     name = data.get('name', '').strip()
     if not name:
         return jsonify({'error': 'Store name is required'}), 400
     try:
         store_id = db.add_store(name)
+        invalidate_cache()
         return jsonify({'id': store_id, 'message': 'Store created'}), 201
     except Exception as e:
         return jsonify({'error': 'Store already exists'}), 400
 
-@app.route('/api/stores/<int:store_id>', methods=['DELETE'])
+@api.route('/stores/<int:store_id>', methods=['DELETE'])
 @require_auth
 def remove_store(store_id):
     """Delete a store"""
     db.delete_store(store_id)
+    invalidate_cache()
     return jsonify({'message': 'Store deleted'})
 
-@app.route('/api/stores/<int:store_id>', methods=['PUT'])
+@api.route('/stores/<int:store_id>', methods=['PUT'])
 @require_auth
 def update_store(store_id):
     """Update a store name"""
-    data = request.json
+    data = request_body()
     name = data.get('name', '').strip()
     if not name:
         return jsonify({'error': 'Store name is required'}), 400
     db.update_store(store_id, name)
+    invalidate_cache()
     return jsonify({'message': 'Store updated'})
 
-@app.route('/api/items/<int:item_id>/store', methods=['PUT'])
+@api.route('/items/<int:item_id>/store', methods=['PUT'])
 @require_auth
 def change_store(item_id):
     """Change item's store"""
-    data = request.json
+    data = request_body()
     new_store_id = data.get('store_id')
     changed_by = data.get('changed_by')
     db.change_item_store(item_id, new_store_id, changed_by)
+    invalidate_cache()
     return jsonify({'message': 'Store updated'})
 
-@app.route('/api/items/<int:item_id>/store-history', methods=['GET'])
+@api.route('/items/<int:item_id>/store-history', methods=['GET'])
 @require_auth
+@cached_json
 def get_store_history(item_id):
     """Get store change history for an item"""
     history = db.get_store_history(item_id)
     return jsonify(history)
 
-@app.route('/api/items/<int:item_id>/frequency', methods=['PUT'])
+@api.route('/items/<int:item_id>/frequency', methods=['PUT'])
 @require_auth
 def set_frequency(item_id):
     """Set target frequency for an item"""
-    data = request.json
+    data = request_body()
     days = data.get('days')
     db.set_target_frequency(item_id, days)
+    invalidate_cache()
     return jsonify({'message': 'Frequency updated'})
 
+app.register_blueprint(api)
+
 if __name__ == '__main__':
-    print("Starting Grocery Tracker...")
+    # Development only - production runs under gunicorn via wsgi.py
+    print("Starting Grocery Tracker (dev server)...")
     print("Server running at http://127.0.0.1:5000")
     app.run(debug=True, port=5000)
@@ -1,12 +1,77 @@
+import asyncio
+import hashlib
+import itertools
+import time
+import queue
 import sqlite3
 import os
+import threading
 from datetime import datetime, timedelta
 from contextlib import contextmanager
 
 # Use PostgreSQL in production (DATABASE_URL), SQLite locally
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
-def get_connection():
+# Convert declared TIMESTAMP columns to datetime on read, matching what
+# psycopg2 returns natively - callers get one type from both backends
+# instead of parsing SQLite's strings themselves
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+
+# Small shared pool of long-lived connections instead of connect/close on
+# every call. This skips the per-query open cost, keeps SQLite's page
+# cache warm between requests, and bounds how many connections exist.
+POOL_SIZE = 5
+RECYCLE_AFTER = 10000  # checkouts before a connection is retired
+
+# The PostgreSQL pool must cover gunicorn's per-worker thread count
+# (8 in render.yaml, plus headroom): psycopg2's getconn raises rather
+# than blocks when the pool is dry, so an undersized pool turns
+# concurrent requests into errors instead of short waits.
+PG_POOL_SIZE = 10
+PG_POOL_TIMEOUT = 5  # seconds to retry an exhausted pool before giving up
+
+_pool = queue.Queue(maxsize=POOL_SIZE)
+_pool_lock = threading.Lock()
+_pool_created = 0
+_pg_pool = None
+
+def _get_pg_pool():
+    """Lazily build psycopg2's thread-safe pool; it already handles
+    checkout blocking and connection reuse, so the queue-based pool below
+    only serves SQLite"""
+    global _pg_pool
+    with _pool_lock:
+        if _pg_pool is None:
+            import psycopg2.pool
+            # Render uses postgres:// but psycopg2 needs postgresql://
+            url = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+            _pg_pool = psycopg2.pool.ThreadedConnectionPool(
+                minconn=2, maxconn=PG_POOL_SIZE, dsn=url)
+        return _pg_pool
+
+def _pg_getconn(pool):
+    """getconn with a bounded blocking retry: brief spikes past the pool
+    size wait for a connection (like the SQLite queue pool and SQLite's
+    own busy_timeout) instead of surfacing a PoolError immediately"""
+    import psycopg2.pool
+    deadline = time.monotonic() + PG_POOL_TIMEOUT
+    while True:
+        try:
+            return pool.getconn()
+        except psycopg2.pool.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+class _PooledConnection:
+    __slots__ = ('conn', 'is_postgres', 'use_count')
+
+    def __init__(self, conn, is_postgres):
+        self.conn = conn
+        self.is_postgres = is_postgres
+        self.use_count = 0
+
+def _new_connection():
     if DATABASE_URL:
         import psycopg2
         import psycopg2.extras
@@ -15,41 +80,307 @@ def get_connection():
         conn = psycopg2.connect(url)
         return conn, True  # True = is_postgres
     else:
-        conn = sqlite3.connect("grocery.db")
+        # check_same_thread off: the pool hands a connection to one thread
+        # at a time, so cross-thread reuse is safe
+        # cached_statements: default LRU holds 100 prepared statements;
+        # 256 keeps every query in this module compiled for the
+        # connection's lifetime
+        conn = sqlite3.connect("grocery.db", check_same_thread=False,
+                               cached_statements=256,
+                               detect_types=sqlite3.PARSE_DECLTYPES)
         conn.row_factory = sqlite3.Row
+        # WAL lets readers proceed while a writer commits; NORMAL sync
+        # cuts fsync traffic without risking corruption in WAL mode
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-20000")      # ~20MB page cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA busy_timeout=5000")      # wait out writer locks
+        conn.execute("PRAGMA foreign_keys=ON")        # enforce declared cascades
+        conn.execute("PRAGMA mmap_size=268435456")    # 256MB, read pages via mmap
         return conn, False  # False = is_sqlite
 
+def _checkout():
+    global _pool_created
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        pass
+    with _pool_lock:
+        if _pool_created < POOL_SIZE:
+            _pool_created += 1
+            conn, is_postgres = _new_connection()
+            return _PooledConnection(conn, is_postgres)
+    # Pool is fully built and busy - wait for a connection to come back
+    return _pool.get()
+
+def _checkin(pooled):
+    global _pool_created
+    pooled.use_count += 1
+    if pooled.use_count >= RECYCLE_AFTER:
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with _pool_lock:
+            _pool_created -= 1
+        return
+    _pool.put(pooled)
+
+def close_pool():
+    """Close every idle pooled connection (for shutdown/tests)"""
+    global _pool_created, _pg_pool
+    with _pool_lock:
+        if _pg_pool is not None:
+            _pg_pool.closeall()
+            _pg_pool = None
+            _pg_statements.clear()
+    while True:
+        try:
+            pooled = _pool.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with _pool_lock:
+            _pool_created -= 1
+
 @contextmanager
 def get_db():
-    conn, is_postgres = get_connection()
+    if DATABASE_URL:
+        pool = _get_pg_pool()
+        conn = _pg_getconn(pool)
+        try:
+            yield conn, True
+        except Exception:
+            # Return the connection to the pool in a clean state. Plans
+            # PREPAREd inside the rolled-back transaction die with it,
+            # so drop this connection's cache - and DEALLOCATE the
+            # session-level plans that survive the rollback, so the
+            # cache and the server agree on which names exist and later
+            # re-PREPAREs can't collide.
+            conn.rollback()
+            if _pg_statements.pop(id(conn), None):
+                try:
+                    conn.autocommit = True
+                    try:
+                        conn.cursor().execute("DEALLOCATE ALL")
+                    finally:
+                        conn.autocommit = False
+                except Exception:
+                    pass  # connection may be gone; putconn deals with it
+            raise
+        finally:
+            pool.putconn(conn)
+        return
+
+    pooled = _checkout()
     try:
-        yield conn, is_postgres
+        yield pooled.conn, pooled.is_postgres
+    except Exception:
+        pooled.conn.rollback()
+        raise
     finally:
-        conn.close()
+        _checkin(pooled)
+
+# Per-connection PREPARE cache for PostgreSQL: the SQL here is a fixed set
+# of templates, so preparing each once per connection lets the server skip
+# parse/plan on every later call. Keyed by id(conn); entries die with the
+# pool. SQLite needs nothing - its connections cache compiled statements.
+_pg_statements = {}
+
+# SQLSTATE for duplicate_prepared_statement: the plan already exists on
+# the session, typically because the cache was dropped but the
+# autocommitted PREPARE survived.
+_PG_DUPLICATE_PSTATEMENT = '42P05'
+
+def _pg_prepared_sql(conn, cursor, query, n_params):
+    statements = _pg_statements.setdefault(id(conn), {})
+    execute_sql = statements.get(query)
+    if execute_sql is None:
+        name = 'ps_' + hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+        parts = query.split('?')
+        dollar_sql = parts[0]
+        for i, part in enumerate(parts[1:], 1):
+            dollar_sql += f'${i}' + part
+        from psycopg2.extensions import STATUS_READY
+        if conn.status == STATUS_READY:
+            # PREPARE is transactional: issued inside a read's implicit
+            # transaction it would be deallocated when the pool rolls
+            # that transaction back at checkin, leaving the cache
+            # pointing at a dead plan. Run it autocommitted instead so
+            # it lives for the session.
+            conn.autocommit = True
+            try:
+                cursor.execute(f"PREPARE {name} AS {dollar_sql}")
+            except Exception as e:
+                # The name is deterministic, so a plan left over from a
+                # dropped cache shows up as duplicate_prepared_statement.
+                # It's the same statement - adopt it.
+                if getattr(e, 'pgcode', None) != _PG_DUPLICATE_PSTATEMENT:
+                    raise
+            finally:
+                conn.autocommit = False
+        else:
+            # Mid-transaction: the plan commits or rolls back with it;
+            # _pg_execute heals the cache if it gets rolled back. The
+            # savepoint keeps a failed PREPARE (e.g. a duplicate name
+            # from a dropped cache) from aborting the transaction.
+            cursor.execute("SAVEPOINT pg_prep")
+            try:
+                cursor.execute(f"PREPARE {name} AS {dollar_sql}")
+            except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT pg_prep")
+                if getattr(e, 'pgcode', None) != _PG_DUPLICATE_PSTATEMENT:
+                    raise
+            else:
+                cursor.execute("RELEASE SAVEPOINT pg_prep")
+        placeholders = ', '.join(['%s'] * n_params)
+        execute_sql = f"EXECUTE {name} ({placeholders})"
+        statements[query] = execute_sql
+    return execute_sql
+
+def _pg_execute(conn, cursor, query, params):
+    """Run query through the per-connection PREPARE cache.
+
+    A cached plan can have been deallocated behind the cache's back (its
+    PREPARE ran inside a transaction that later rolled back), so failure
+    recovery must not roll back the whole transaction: inside a composite
+    that would silently drop the earlier statements while the tail gets
+    re-run and committed. Inside a transaction the EXECUTE therefore runs
+    under a savepoint and recovery rolls back to it; outside one, the
+    failed EXECUTE is the only statement in flight and a plain rollback
+    is safe. Either way the stale entry is dropped and the statement
+    re-run untranslated, which re-prepares on next sight.
+    """
+    from psycopg2.extensions import STATUS_READY
+    in_transaction = conn.status != STATUS_READY
+    try:
+        execute_sql = _pg_prepared_sql(conn, cursor, query, len(params))
+    except Exception:
+        # PREPARE refused; forget it and run the statement plain. Both
+        # PREPARE paths clean up after themselves (autocommit outside a
+        # transaction, savepoint inside), so no rollback is needed here.
+        _pg_statements.get(id(conn), {}).pop(query, None)
+        cursor.execute(_pg_translate(query), params)
+        return cursor
+    if in_transaction:
+        cursor.execute("SAVEPOINT pg_exec")
+        try:
+            cursor.execute(execute_sql, params)
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT pg_exec")
+            _pg_statements.get(id(conn), {}).pop(query, None)
+            cursor.execute(_pg_translate(query), params)
+        else:
+            cursor.execute("RELEASE SAVEPOINT pg_exec")
+        return cursor
+    try:
+        cursor.execute(execute_sql, params)
+    except Exception:
+        _pg_statements.get(id(conn), {}).pop(query, None)
+        conn.rollback()
+        cursor.execute(_pg_translate(query), params)
+    return cursor
+
+@contextmanager
+def transaction():
+    """Group several write helpers under one commit.
+
+    Yields (conn, is_postgres); commits when the block exits cleanly.
+    Callers composing multiple _-prefixed statement helpers (e.g. record
+    a purchase and change the store) pay a single fsync instead of one
+    per helper. get_db's rollback covers the failure path.
+    """
+    with get_db() as (conn, is_postgres):
+        yield conn, is_postgres
+        conn.commit()
+
+_stream_ids = itertools.count()
+
+# Dialect specialization, paid once instead of per call: placeholder
+# translation is memoized per query string (the SQL here is a fixed set
+# of templates), and the RealDictCursor factory is resolved on first use
+# rather than re-imported inside every execute_query.
+_pg_translated = {}
+_pg_cursor_factory = None
+
+def _pg_translate(query):
+    sql = _pg_translated.get(query)
+    if sql is None:
+        sql = _pg_translated[query] = query.replace('?', '%s')
+    return sql
+
+def _pg_factory():
+    global _pg_cursor_factory
+    if _pg_cursor_factory is None:
+        from psycopg2.extras import RealDictCursor
+        _pg_cursor_factory = RealDictCursor
+    return _pg_cursor_factory
+
+def execute_query(conn, is_postgres, query, params=None, stream=False):
+    """Execute a query, handling SQLite vs PostgreSQL differences.
 
-def execute_query(conn, is_postgres, query, params=None):
-    """Execute a query, handling SQLite vs PostgreSQL differences"""
+    stream=True requests batched row delivery: a named server-side cursor
+    on PostgreSQL (rows travel in itersize chunks instead of one big
+    result), a bumped arraysize on SQLite. Pair with iter_as_dicts and
+    consume before the connection goes back to the pool.
+    """
     if is_postgres:
-        # Convert ? to %s for PostgreSQL
-        query = query.replace('?', '%s')
-        import psycopg2.extras
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    else:
-        cursor = conn.cursor()
+        if stream:
+            cursor = conn.cursor(f'stream_{next(_stream_ids)}',
+                                 cursor_factory=_pg_factory())
+            cursor.itersize = 500
+            cursor.execute(_pg_translate(query), params or None)
+            return cursor
+        cursor = conn.cursor(cursor_factory=_pg_factory())
+        if params:
+            return _pg_execute(conn, cursor, query, params)
+        cursor.execute(_pg_translate(query), None)
+        return cursor
 
+    cursor = conn.cursor()
     if params:
         cursor.execute(query, params)
     else:
         cursor.execute(query)
     return cursor
 
+def iter_as_dicts(cursor, is_postgres, arraysize=500):
+    """Yield rows as dicts in arraysize batches without materializing
+    the whole result set"""
+    if is_postgres:
+        while True:
+            rows = cursor.fetchmany(arraysize)
+            if not rows:
+                return
+            yield from rows
+    else:
+        cursor.arraysize = arraysize
+        keys = None
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                return
+            if keys is None:
+                keys = rows[0].keys()
+            for row in rows:
+                yield dict(zip(keys, row))
+
 def fetchall_as_dicts(cursor, is_postgres):
     """Fetch all results as list of dicts"""
     if is_postgres:
         return cursor.fetchall()  # Already dicts with RealDictCursor
     else:
         rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        if not rows:
+            return []
+        # Column names are identical for every row; grab them once and
+        # zip instead of paying sqlite3.Row's keyed lookups per dict
+        keys = rows[0].keys()
+        return [dict(zip(keys, row)) for row in rows]
 
 def fetchone_as_dict(cursor, is_postgres):
     """Fetch one result as dict"""
@@ -57,12 +388,34 @@ def fetchone_as_dict(cursor, is_postgres):
     if row is None:
         return None
     if is_postgres:
-        return dict(row)
-    else:
-        return dict(row)
+        # RealDictCursor already hands back a dict; copying it again
+        # just doubles the allocation
+        return row
+    # sqlite3.Row supports indexing but not .get()/jsonify, so the
+    # SQLite branch still materializes a real dict
+    return dict(row)
+
+# Seeds items.on_sale_now from each item's newest price record (runs in
+# both dialects; only needed when the column is first added)
+_BACKFILL_ON_SALE_NOW = """
+    UPDATE items SET on_sale_now = COALESCE(
+        (SELECT on_sale FROM price_history
+         WHERE item_id = items.id
+         ORDER BY checked_at DESC LIMIT 1), 0)
+"""
+
+# Seeds the denormalized purchase stats; note purchase_count matches the
+# old COUNT(p.id), which included not-available records
+_BACKFILL_PURCHASE_STATS = """
+    UPDATE items SET
+        purchase_count = (SELECT COUNT(*) FROM purchases WHERE item_id = items.id),
+        last_purchased = (SELECT MAX(purchased_at) FROM purchases WHERE item_id = items.id)
+"""
 
 def init_db():
-    conn, is_postgres = get_connection()
+    # Runs once at startup; use a dedicated connection so schema setup
+    # never ties up a pool slot
+    conn, is_postgres = _new_connection()
     cursor = conn.cursor()
 
     if is_postgres:
@@ -93,16 +446,37 @@ def init_db():
                 added_by INTEGER REFERENCES users(id),
                 occasional INTEGER DEFAULT 0,
                 target_frequency INTEGER,
+                on_sale_now INTEGER DEFAULT 0,
+                purchase_count INTEGER DEFAULT 0,
+                last_purchased TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
         # Add notes column if it doesn't exist (for existing tables)
-        cursor.execute("SAVEPOINT add_notes_col")
-        try:
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'items' AND column_name = 'notes'
+        """)
+        if cursor.fetchone() is None:
             cursor.execute("ALTER TABLE items ADD COLUMN notes TEXT")
-        except:
-            cursor.execute("ROLLBACK TO SAVEPOINT add_notes_col")
-        cursor.execute("RELEASE SAVEPOINT add_notes_col")
+        # on_sale_now mirrors the newest price_history row's on_sale flag;
+        # backfill once when the column first appears
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'items' AND column_name = 'on_sale_now'
+        """)
+        if cursor.fetchone() is None:
+            cursor.execute("ALTER TABLE items ADD COLUMN on_sale_now INTEGER DEFAULT 0")
+            cursor.execute(_BACKFILL_ON_SALE_NOW)
+        # purchase_count/last_purchased are maintained by the record helpers
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'items' AND column_name = 'purchase_count'
+        """)
+        if cursor.fetchone() is None:
+            cursor.execute("ALTER TABLE items ADD COLUMN purchase_count INTEGER DEFAULT 0")
+            cursor.execute("ALTER TABLE items ADD COLUMN last_purchased TIMESTAMP")
+            cursor.execute(_BACKFILL_PURCHASE_STATS)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS purchases (
                 id SERIAL PRIMARY KEY,
@@ -115,12 +489,12 @@ def init_db():
             )
         """)
         # Add not_available column if it doesn't exist (for existing tables)
-        cursor.execute("SAVEPOINT add_na_col")
-        try:
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'purchases' AND column_name = 'not_available'
+        """)
+        if cursor.fetchone() is None:
             cursor.execute("ALTER TABLE purchases ADD COLUMN not_available INTEGER DEFAULT 0")
-        except:
-            cursor.execute("ROLLBACK TO SAVEPOINT add_na_col")
-        cursor.execute("RELEASE SAVEPOINT add_na_col")
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS price_history (
                 id SERIAL PRIMARY KEY,
@@ -145,6 +519,35 @@ def init_db():
             CREATE INDEX IF NOT EXISTS idx_purchases_item
             ON purchases (item_id, purchased_at DESC)
         """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_price_history_item_checked
+            ON price_history (item_id, checked_at DESC, price, on_sale, regular_price)
+        """)
+        # Partial indexes: each hot query filters on a fixed on_list value,
+        # so index only the matching rows instead of the whole table
+        cursor.execute("DROP INDEX IF EXISTS idx_items_on_list_created")
+        cursor.execute("DROP INDEX IF EXISTS idx_items_frequent")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_items_on_list_true
+            ON items (created_at DESC) WHERE on_list = 1
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_items_frequent_off_list
+            ON items (purchase_count DESC, last_purchased DESC)
+            WHERE on_list = 0 AND (occasional = 0 OR occasional IS NULL)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_purchases_item_date
+            ON purchases (item_id, purchased_at)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_store_history_item_time
+            ON store_history (item_id, changed_at DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_purchases_user
+            ON purchases (user_id)
+        """)
     else:
         # SQLite schema
         cursor.executescript("""
@@ -170,6 +573,9 @@ def init_db():
                 added_by INTEGER,
                 occasional INTEGER DEFAULT 0,
                 target_frequency INTEGER,
+                on_sale_now INTEGER DEFAULT 0,
+                purchase_count INTEGER DEFAULT 0,
+                last_purchased TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (store_id) REFERENCES stores (id),
                 FOREIGN KEY (added_by) REFERENCES users (id)
@@ -209,25 +615,69 @@ def init_db():
                 FOREIGN KEY (changed_by) REFERENCES users (id)
             );
 
+        """)
+
+        # Add columns to existing SQLite tables if they don't exist; diff
+        # against table_info instead of probing with ALTER and catching
+        # the error for every column on every startup
+        migrations = {
+            'items': ['store_id INTEGER', 'added_by INTEGER', 'occasional INTEGER DEFAULT 0',
+                      'target_frequency INTEGER', 'image_url TEXT', 'notes TEXT',
+                      'on_sale_now INTEGER DEFAULT 0',
+                      'purchase_count INTEGER DEFAULT 0', 'last_purchased TIMESTAMP'],
+            'purchases': ['user_id INTEGER', 'not_available INTEGER DEFAULT 0'],
+        }
+        for table, columns in migrations.items():
+            existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+            backfills = []
+            for col in columns:
+                if col.split()[0] not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col}")
+                    if col.startswith('on_sale_now'):
+                        backfills.append(_BACKFILL_ON_SALE_NOW)
+                    elif col.startswith('purchase_count'):
+                        backfills.append(_BACKFILL_PURCHASE_STATS)
+            # Backfills wait until every column exists: the purchase-stats
+            # UPDATE also writes last_purchased, which sits after
+            # purchase_count in the migration list
+            for backfill in backfills:
+                cursor.execute(backfill)
+
+        # Indexes go after the column migrations: the partial items
+        # indexes cover occasional and purchase_count, which older
+        # databases gain just above. Each hot items query filters on a
+        # fixed on_list value, so index only the matching rows (partial
+        # indexes) instead of the whole table; the old full-table
+        # versions are dropped on upgrade.
+        cursor.executescript("""
+            DROP INDEX IF EXISTS idx_items_on_list_created;
+            DROP INDEX IF EXISTS idx_items_frequent;
+
             CREATE INDEX IF NOT EXISTS idx_purchases_item
             ON purchases (item_id, purchased_at DESC);
-        """)
 
-        # Add columns to existing SQLite tables if they don't exist
-        for col in ['store_id INTEGER', 'added_by INTEGER', 'occasional INTEGER DEFAULT 0', 'target_frequency INTEGER', 'image_url TEXT', 'notes TEXT']:
-            try:
-                cursor.execute(f"ALTER TABLE items ADD COLUMN {col}")
-            except sqlite3.OperationalError:
-                pass
-        try:
-            cursor.execute("ALTER TABLE purchases ADD COLUMN user_id INTEGER")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            cursor.execute("ALTER TABLE purchases ADD COLUMN not_available INTEGER DEFAULT 0")
-        except sqlite3.OperationalError:
-            pass
+            CREATE INDEX IF NOT EXISTS idx_price_history_item_checked
+            ON price_history (item_id, checked_at DESC, price, on_sale, regular_price);
+
+            CREATE INDEX IF NOT EXISTS idx_items_on_list_true
+            ON items (created_at DESC) WHERE on_list = 1;
+
+            CREATE INDEX IF NOT EXISTS idx_items_frequent_off_list
+            ON items (purchase_count DESC, last_purchased DESC)
+            WHERE on_list = 0 AND (occasional = 0 OR occasional IS NULL);
+
+            CREATE INDEX IF NOT EXISTS idx_purchases_item_date
+            ON purchases (item_id, purchased_at);
 
+            CREATE INDEX IF NOT EXISTS idx_store_history_item_time
+            ON store_history (item_id, changed_at DESC);
+
+            CREATE INDEX IF NOT EXISTS idx_purchases_user
+            ON purchases (user_id);
+        """)
+
+    # Refresh planner statistics so the new indexes actually get picked
+    cursor.execute("ANALYZE")
     conn.commit()
     conn.close()
 
@@ -238,172 +688,296 @@ def add_item(name, whole_foods_url=None, image_url=None, store_id=None, added_by
             (name, whole_foods_url, image_url, store_id, added_by, 1 if occasional else 0)
         )
         conn.commit()
-        if is_postgres:
-            return cursor.fetchone()['id']
-        return cursor.lastrowid
+        item_id = cursor.fetchone()['id'] if is_postgres else cursor.lastrowid
+    # Invalidate after the commit: dropping the snapshot first leaves a
+    # window where a concurrent read re-caches the pre-write rows
+    _invalidate_items_snapshot()
+    return item_id
+
+# SQL fragments that compute purchase frequency and the predicted next
+# purchase inline, replacing the per-item calculate_frequency /
+# predict_next_purchase round trips. Interval days are truncated to whole
+# days and same-day repeats ignored, matching the Python versions. Built
+# once per dialect so the list queries hand SQLite/PG byte-identical
+# statement text (which keeps statement caches warm).
+
+_FREQ_CTE_PG = """
+    WITH intervals AS (
+        SELECT item_id,
+               FLOOR(EXTRACT(EPOCH FROM (purchased_at - LAG(purchased_at)
+                   OVER (PARTITION BY item_id ORDER BY purchased_at))) / 86400) AS d
+        FROM purchases
+    ),
+    freq AS (
+        SELECT item_id, AVG(d) AS avg_days FROM intervals WHERE d > 0 GROUP BY item_id
+    )
+"""
+
+_FREQ_CTE_SQLITE = """
+    WITH intervals AS (
+        SELECT item_id,
+               CAST(julianday(purchased_at) - julianday(LAG(purchased_at)
+                   OVER (PARTITION BY item_id ORDER BY purchased_at)) AS INTEGER) AS d
+        FROM purchases
+    ),
+    freq AS (
+        SELECT item_id, AVG(d) AS avg_days FROM intervals WHERE d > 0 GROUP BY item_id
+    )
+"""
+
+_FREQUENCY_COL = "CAST(ROUND(f.avg_days) AS INTEGER) as frequency_days"
+
+_NEXT_PURCHASE_COL_PG = (
+    "to_char(i.last_purchased + make_interval(days => "
+    "CAST(COALESCE(NULLIF(i.target_frequency, 0), ROUND(f.avg_days)) AS INTEGER)), "
+    "'YYYY-MM-DD') as next_purchase"
+)
+
+_NEXT_PURCHASE_COL_SQLITE = (
+    "date(i.last_purchased, '+' || "
+    "CAST(COALESCE(NULLIF(i.target_frequency, 0), ROUND(f.avg_days)) AS INTEGER) || ' days') "
+    "as next_purchase"
+)
+
+def _frequency_sql(is_postgres):
+    if is_postgres:
+        return _FREQ_CTE_PG, _FREQUENCY_COL, _NEXT_PURCHASE_COL_PG
+    return _FREQ_CTE_SQLITE, _FREQUENCY_COL, _NEXT_PURCHASE_COL_SQLITE
+
+# Materialized snapshot of get_all_items: the endpoint is the hottest read
+# and its inputs only change through the write helpers below, each of which
+# drops the snapshot. The TTL is a cross-process backstop: invalidation is
+# per-process, so a write handled by another gunicorn worker (or the cron
+# scraper) can't drop this one's snapshot - entries expire on their own
+# instead of serving stale rows indefinitely. Kept short so a user who
+# writes through one worker and reads through the other sees their change
+# within a few seconds.
+_SNAPSHOT_TTL = 5
+_items_snapshot = None
+_items_snapshot_time = 0.0
+_snapshot_lock = threading.Lock()
+
+def _invalidate_items_snapshot():
+    global _items_snapshot
+    with _snapshot_lock:
+        _items_snapshot = None
+
+def get_all_items(limit=None, offset=0):
+    """Get all items with purchase stats.
+
+    limit/offset paginate the result; i.id breaks created_at ties so
+    pages are stable. A warm snapshot is sliced directly; paginated cold
+    reads push LIMIT/OFFSET into SQL and skip the snapshot.
+    """
+    global _items_snapshot, _items_snapshot_time
+    with _snapshot_lock:
+        snapshot = _items_snapshot
+        if snapshot is not None and time.monotonic() - _items_snapshot_time >= _SNAPSHOT_TTL:
+            snapshot = _items_snapshot = None
+    if snapshot is not None:
+        if limit is None:
+            return snapshot[offset:] if offset else snapshot
+        return snapshot[offset:offset + limit]
+
+    page_sql = ""
+    params = None
+    if limit is not None:
+        page_sql = "LIMIT ? OFFSET ?"
+        params = (limit, offset)
 
-def get_all_items():
-    """Get all items with purchase stats"""
     with get_db() as (conn, is_postgres):
-        cursor = execute_query(conn, is_postgres, """
+        freq_cte, frequency_col, next_purchase_col = _frequency_sql(is_postgres)
+        cursor = execute_query(conn, is_postgres, f"""
+            {freq_cte}
             SELECT i.*,
-                   COUNT(p.id) as purchase_count,
-                   MAX(p.purchased_at) as last_purchased,
-                   MAX(ph.price) as current_price,
-                   MAX(ph.on_sale) as on_sale
+                   ph.price as current_price,
+                   ph.on_sale as on_sale,
+                   {frequency_col},
+                   {next_purchase_col}
             FROM items i
-            LEFT JOIN purchases p ON p.item_id = i.id
-            LEFT JOIN price_history ph ON ph.id = (
-                SELECT id FROM price_history
-                WHERE item_id = i.id
-                ORDER BY checked_at DESC
-                LIMIT 1
-            )
-            GROUP BY i.id
-            ORDER BY i.on_list DESC, i.created_at DESC
-        """)
-        items = fetchall_as_dicts(cursor, is_postgres)
+            LEFT JOIN (
+                SELECT item_id, price, regular_price, on_sale,
+                       ROW_NUMBER() OVER (PARTITION BY item_id
+                           ORDER BY checked_at DESC, id DESC) AS rn
+                FROM price_history
+            ) ph ON ph.item_id = i.id AND ph.rn = 1
+            LEFT JOIN freq f ON f.item_id = i.id
+            ORDER BY i.on_list DESC, i.created_at DESC, i.id
+            {page_sql}
+        """, params)
+        result = fetchall_as_dicts(cursor, is_postgres)
 
-        result = []
-        for item in items:
-            item['frequency_days'] = calculate_frequency(item['id'])
-            item['next_purchase'] = predict_next_purchase(item['id'])
-            result.append(item)
-        return result
+    if limit is None and not offset:
+        with _snapshot_lock:
+            _items_snapshot = result
+            _items_snapshot_time = time.monotonic()
+    return result
 
 def get_items_on_list():
     """Get items currently on the shopping list"""
     with get_db() as (conn, is_postgres):
-        cursor = execute_query(conn, is_postgres, """
+        freq_cte, frequency_col, _ = _frequency_sql(is_postgres)
+        cursor = execute_query(conn, is_postgres, f"""
+            {freq_cte}
             SELECT i.*,
-                   COUNT(p.id) as purchase_count,
-                   MAX(p.purchased_at) as last_purchased,
-                   MAX(ph.price) as current_price,
-                   MAX(ph.on_sale) as on_sale,
+                   ph.price as current_price,
+                   ph.on_sale as on_sale,
                    s.name as store_name,
-                   u.name as added_by_name
+                   u.name as added_by_name,
+                   {frequency_col}
             FROM items i
-            LEFT JOIN purchases p ON p.item_id = i.id
-            LEFT JOIN price_history ph ON ph.id = (
-                SELECT id FROM price_history
-                WHERE item_id = i.id
-                ORDER BY checked_at DESC
-                LIMIT 1
-            )
+            LEFT JOIN (
+                SELECT item_id, price, regular_price, on_sale,
+                       ROW_NUMBER() OVER (PARTITION BY item_id
+                           ORDER BY checked_at DESC, id DESC) AS rn
+                FROM price_history
+            ) ph ON ph.item_id = i.id AND ph.rn = 1
             LEFT JOIN stores s ON i.store_id = s.id
             LEFT JOIN users u ON i.added_by = u.id
+            LEFT JOIN freq f ON f.item_id = i.id
             WHERE i.on_list = 1
-            GROUP BY i.id, s.name, u.name
             ORDER BY i.created_at DESC
         """)
-        items = fetchall_as_dicts(cursor, is_postgres)
-
-        result = []
-        for item in items:
-            item['frequency_days'] = calculate_frequency(item['id'])
-            result.append(item)
-        return result
+        return fetchall_as_dicts(cursor, is_postgres)
 
 def get_frequent_items():
     """Get items not on list, ordered by purchase frequency (excludes occasional items)"""
     with get_db() as (conn, is_postgres):
-        cursor = execute_query(conn, is_postgres, """
+        freq_cte, frequency_col, next_purchase_col = _frequency_sql(is_postgres)
+        cursor = execute_query(conn, is_postgres, f"""
+            {freq_cte}
             SELECT i.*,
-                   COUNT(p.id) as purchase_count,
-                   MAX(p.purchased_at) as last_purchased,
-                   MAX(ph.price) as current_price,
-                   MAX(ph.on_sale) as on_sale,
+                   ph.price as current_price,
+                   ph.on_sale as on_sale,
                    s.name as store_name,
-                   u.name as added_by_name
+                   u.name as added_by_name,
+                   {frequency_col},
+                   {next_purchase_col}
             FROM items i
-            LEFT JOIN purchases p ON p.item_id = i.id
-            LEFT JOIN price_history ph ON ph.id = (
-                SELECT id FROM price_history
-                WHERE item_id = i.id
-                ORDER BY checked_at DESC
-                LIMIT 1
-            )
+            LEFT JOIN (
+                SELECT item_id, price, regular_price, on_sale,
+                       ROW_NUMBER() OVER (PARTITION BY item_id
+                           ORDER BY checked_at DESC, id DESC) AS rn
+                FROM price_history
+            ) ph ON ph.item_id = i.id AND ph.rn = 1
             LEFT JOIN stores s ON i.store_id = s.id
             LEFT JOIN users u ON i.added_by = u.id
+            LEFT JOIN freq f ON f.item_id = i.id
             WHERE i.on_list = 0 AND (i.occasional = 0 OR i.occasional IS NULL)
-            GROUP BY i.id, s.name, u.name
-            HAVING COUNT(p.id) >= 1
-            ORDER BY COUNT(p.id) DESC, MAX(p.purchased_at) DESC
+              AND i.purchase_count >= 1
+            ORDER BY i.purchase_count DESC, i.last_purchased DESC
             LIMIT 20
         """)
-        items = fetchall_as_dicts(cursor, is_postgres)
+        return fetchall_as_dicts(cursor, is_postgres)
 
-        result = []
-        for item in items:
-            item['frequency_days'] = calculate_frequency(item['id'])
-            item['next_purchase'] = predict_next_purchase(item['id'])
-            result.append(item)
-        return result
+# Per-item cache for the two frequency helpers. Purchase history changes
+# rarely, so results are cached under an epoch the purchase/target writers
+# bump (dropping everything) plus a TTL backstop.
+_freq_cache = {}
+_freq_epoch = 0
+_FREQ_TTL = 300  # seconds
 
-def calculate_frequency(item_id):
-    """Calculate average days between purchases"""
-    with get_db() as (conn, is_postgres):
-        cursor = execute_query(conn, is_postgres,
-            "SELECT purchased_at FROM purchases WHERE item_id = ? ORDER BY purchased_at",
-            (item_id,)
-        )
-        purchases = fetchall_as_dicts(cursor, is_postgres)
+def _bump_freq_epoch():
+    global _freq_epoch
+    _freq_epoch += 1
+    _freq_cache.clear()
 
-        if len(purchases) < 2:
-            return None
+def _freq_cached(kind, item_id, compute):
+    key = (kind, item_id, _freq_epoch)
+    hit = _freq_cache.get(key)
+    now = time.monotonic()
+    if hit is not None and hit[1] > now:
+        return hit[0]
+    value = compute(item_id)
+    _freq_cache[key] = (value, now + _FREQ_TTL)
+    return value
 
-        # Calculate intervals between purchases
-        intervals = []
-        for i in range(1, len(purchases)):
-            prev_str = str(purchases[i-1]['purchased_at'])
-            curr_str = str(purchases[i]['purchased_at'])
-            # Handle both string and datetime objects
-            if 'T' in prev_str or ' ' in prev_str:
-                prev = datetime.fromisoformat(prev_str.replace(' ', 'T').split('.')[0])
-                curr = datetime.fromisoformat(curr_str.replace(' ', 'T').split('.')[0])
-            else:
-                prev = datetime.fromisoformat(prev_str)
-                curr = datetime.fromisoformat(curr_str)
-            days = (curr - prev).days
-            if days > 0:  # Ignore same-day purchases
-                intervals.append(days)
+def calculate_frequency(item_id):
+    """Calculate average days between purchases"""
+    return _freq_cached('freq', item_id, _calculate_frequency)
 
-        if not intervals:
+def _calculate_frequency(item_id):
+    with get_db() as (conn, is_postgres):
+        # Same whole-day interval averaging as _frequency_sql, scoped to
+        # one item: no Python datetime objects, one pass over the index
+        if is_postgres:
+            query = """
+                SELECT AVG(d) AS avg_days FROM (
+                    SELECT FLOOR(EXTRACT(EPOCH FROM (purchased_at - LAG(purchased_at)
+                        OVER (ORDER BY purchased_at))) / 86400) AS d
+                    FROM purchases WHERE item_id = ?
+                ) s WHERE d > 0
+            """
+        else:
+            query = """
+                SELECT AVG(d) AS avg_days FROM (
+                    SELECT CAST(julianday(purchased_at) - julianday(LAG(purchased_at)
+                        OVER (ORDER BY purchased_at)) AS INTEGER) AS d
+                    FROM purchases WHERE item_id = ?
+                ) WHERE d > 0
+            """
+        row = fetchone_as_dict(execute_query(conn, is_postgres, query, (item_id,)), is_postgres)
+        if row is None or row['avg_days'] is None:
             return None
-
-        return round(sum(intervals) / len(intervals))
+        return round(row['avg_days'])
 
 def predict_next_purchase(item_id):
     """Predict when item will be needed next"""
+    return _freq_cached('next', item_id, _predict_next_purchase)
+
+def _predict_next_purchase(item_id):
     with get_db() as (conn, is_postgres):
-        # Get item info including target_frequency
-        cursor = execute_query(conn, is_postgres,
-            "SELECT target_frequency FROM items WHERE id = ?",
-            (item_id,)
-        )
-        item = fetchone_as_dict(cursor, is_postgres)
+        # One round trip: frequency (target override or LAG average), date
+        # addition and %Y-%m-%d formatting all happen in SQL, matching the
+        # next_purchase column the list queries compute
+        if is_postgres:
+            query = """
+                SELECT to_char(last_at + make_interval(days => days),
+                               'YYYY-MM-DD') AS next_purchase
+                FROM (
+                    SELECT MAX(purchased_at) AS last_at,
+                           COALESCE(
+                               NULLIF((SELECT target_frequency FROM items WHERE id = ?), 0),
+                               (SELECT CAST(ROUND(AVG(d)) AS INTEGER) FROM (
+                                   SELECT FLOOR(EXTRACT(EPOCH FROM (purchased_at - LAG(purchased_at)
+                                       OVER (ORDER BY purchased_at))) / 86400) AS d
+                                   FROM purchases WHERE item_id = ?
+                               ) s WHERE d > 0)
+                           ) AS days
+                    FROM purchases WHERE item_id = ?
+                ) t WHERE last_at IS NOT NULL AND days IS NOT NULL
+            """
+        else:
+            query = """
+                SELECT strftime('%Y-%m-%d', last_at, printf('+%d days', days)) AS next_purchase
+                FROM (
+                    SELECT MAX(purchased_at) AS last_at,
+                           COALESCE(
+                               NULLIF((SELECT target_frequency FROM items WHERE id = ?), 0),
+                               (SELECT CAST(ROUND(AVG(d)) AS INTEGER) FROM (
+                                   SELECT CAST(julianday(purchased_at) - julianday(LAG(purchased_at)
+                                       OVER (ORDER BY purchased_at)) AS INTEGER) AS d
+                                   FROM purchases WHERE item_id = ?
+                               ) WHERE d > 0)
+                           ) AS days
+                    FROM purchases WHERE item_id = ?
+                ) WHERE last_at IS NOT NULL AND days IS NOT NULL
+            """
+        row = fetchone_as_dict(
+            execute_query(conn, is_postgres, query, (item_id, item_id, item_id)),
+            is_postgres)
+        return row['next_purchase'] if row else None
 
+def get_items_with_urls():
+    """Get items that have a Whole Foods URL to scrape"""
+    with get_db() as (conn, is_postgres):
         cursor = execute_query(conn, is_postgres,
-            "SELECT purchased_at FROM purchases WHERE item_id = ? ORDER BY purchased_at DESC LIMIT 1",
-            (item_id,)
+            "SELECT id, name, whole_foods_url FROM items WHERE whole_foods_url IS NOT NULL AND whole_foods_url != ''",
+            stream=True
         )
-        last = fetchone_as_dict(cursor, is_postgres)
-
-        if not last:
-            return None
-
-        # Use target_frequency if set, otherwise calculate from purchases
-        freq = item['target_frequency'] if item and item.get('target_frequency') else calculate_frequency(item_id)
-        if not freq:
-            return None
-
-        last_str = str(last['purchased_at'])
-        if 'T' in last_str or ' ' in last_str:
-            last_date = datetime.fromisoformat(last_str.replace(' ', 'T').split('.')[0])
-        else:
-            last_date = datetime.fromisoformat(last_str)
-        next_date = last_date + timedelta(days=freq)
-        return next_date.strftime('%Y-%m-%d')
+        # Batched delivery: on PostgreSQL the named cursor keeps the full
+        # result server-side; on SQLite rows stream straight into dicts
+        return list(iter_as_dicts(cursor, is_postgres))
 
 def get_item(item_id):
     with get_db() as (conn, is_postgres):
@@ -413,64 +987,85 @@ def get_item(item_id):
         return fetchone_as_dict(cursor, is_postgres)
 
 def update_item(item_id, name=None, whole_foods_url=None, image_url=None, on_list=None, notes=None):
+    updates = []
+    params = []
+
+    if name is not None:
+        updates.append("name = ?")
+        params.append(name)
+    if whole_foods_url is not None:
+        updates.append("whole_foods_url = ?")
+        params.append(whole_foods_url)
+    if image_url is not None:
+        updates.append("image_url = ?")
+        params.append(image_url if image_url else None)
+    if on_list is not None:
+        updates.append("on_list = ?")
+        params.append(1 if on_list else 0)
+    if notes is not None:
+        updates.append("notes = ?")
+        params.append(notes if notes else None)
+
+    # No-op updates never touch the pool or the snapshot
+    if not updates:
+        return
+
     with get_db() as (conn, is_postgres):
-        updates = []
-        params = []
-
-        if name is not None:
-            updates.append("name = ?")
-            params.append(name)
-        if whole_foods_url is not None:
-            updates.append("whole_foods_url = ?")
-            params.append(whole_foods_url)
-        if image_url is not None:
-            updates.append("image_url = ?")
-            params.append(image_url if image_url else None)
-        if on_list is not None:
-            updates.append("on_list = ?")
-            params.append(1 if on_list else 0)
-        if notes is not None:
-            updates.append("notes = ?")
-            params.append(notes if notes else None)
-
-        if updates:
-            params.append(item_id)
-            query = f"UPDATE items SET {', '.join(updates)} WHERE id = ?"
-            execute_query(conn, is_postgres, query, params)
-            conn.commit()
+        params.append(item_id)
+        query = f"UPDATE items SET {', '.join(updates)} WHERE id = ?"
+        execute_query(conn, is_postgres, query, params)
+        conn.commit()
+    _invalidate_items_snapshot()
 
 def delete_item(item_id):
+    # Child rows (purchases, price_history, store_history) are declared
+    # ON DELETE CASCADE, so one statement replaces the old four-step cleanup
     with get_db() as (conn, is_postgres):
-        execute_query(conn, is_postgres, "DELETE FROM purchases WHERE item_id = ?", (item_id,))
-        execute_query(conn, is_postgres, "DELETE FROM price_history WHERE item_id = ?", (item_id,))
-        execute_query(conn, is_postgres, "DELETE FROM store_history WHERE item_id = ?", (item_id,))
-        execute_query(conn, is_postgres, "DELETE FROM items WHERE id = ?", (item_id,))
-        conn.commit()
+        with conn:
+            execute_query(conn, is_postgres, "DELETE FROM items WHERE id = ?", (item_id,))
+    _invalidate_items_snapshot()
+
+def _record_purchase(conn, is_postgres, item_id, price=None, on_sale=False, user_id=None):
+    """Statements only - no commit; run inside transaction()"""
+    execute_query(conn, is_postgres,
+        "INSERT INTO purchases (item_id, price, on_sale, user_id, not_available) VALUES (?, ?, ?, ?, 0)",
+        (item_id, price, 1 if on_sale else 0, user_id)
+    )
+    execute_query(conn, is_postgres,
+        """UPDATE items SET on_list = 0,
+               purchase_count = purchase_count + 1,
+               last_purchased = CURRENT_TIMESTAMP
+           WHERE id = ?""", (item_id,))
 
 def record_purchase(item_id, price=None, on_sale=False, user_id=None):
     """Record a purchase and remove item from list"""
-    with get_db() as (conn, is_postgres):
-        execute_query(conn, is_postgres,
-            "INSERT INTO purchases (item_id, price, on_sale, user_id, not_available) VALUES (?, ?, ?, ?, 0)",
-            (item_id, price, 1 if on_sale else 0, user_id)
-        )
-        execute_query(conn, is_postgres, "UPDATE items SET on_list = 0 WHERE id = ?", (item_id,))
-        conn.commit()
+    with transaction() as (conn, is_postgres):
+        _record_purchase(conn, is_postgres, item_id, price, on_sale, user_id)
+    _invalidate_items_snapshot()
+    _bump_freq_epoch()
 
 def record_not_available(item_id, user_id=None):
     """Record that item was not available - keeps item on list"""
     with get_db() as (conn, is_postgres):
-        execute_query(conn, is_postgres,
-            "INSERT INTO purchases (item_id, user_id, not_available) VALUES (?, ?, 1)",
-            (item_id, user_id)
-        )
-        conn.commit()
+        with conn:
+            execute_query(conn, is_postgres,
+                "INSERT INTO purchases (item_id, user_id, not_available) VALUES (?, ?, 1)",
+                (item_id, user_id)
+            )
+            # not-available records always counted toward purchase stats
+            execute_query(conn, is_postgres,
+                """UPDATE items SET purchase_count = purchase_count + 1,
+                       last_purchased = CURRENT_TIMESTAMP
+                   WHERE id = ?""", (item_id,))
+    _invalidate_items_snapshot()
+    _bump_freq_epoch()
 
 def add_to_list(item_id):
     """Add an item back to the shopping list"""
     with get_db() as (conn, is_postgres):
         execute_query(conn, is_postgres, "UPDATE items SET on_list = 1 WHERE id = ?", (item_id,))
         conn.commit()
+    _invalidate_items_snapshot()
 
 def get_purchase_history(item_id, limit=30):
     with get_db() as (conn, is_postgres):
@@ -483,14 +1078,56 @@ def get_purchase_history(item_id, limit=30):
         )
         return fetchall_as_dicts(cursor, is_postgres)
 
+def _add_price_record(conn, is_postgres, item_id, price, regular_price=None, on_sale=False):
+    """Statements only - no commit; run inside transaction()"""
+    execute_query(conn, is_postgres,
+        """INSERT INTO price_history (item_id, price, regular_price, on_sale)
+           VALUES (?, ?, ?, ?)""",
+        (item_id, price, regular_price, 1 if on_sale else 0)
+    )
+    execute_query(conn, is_postgres,
+        "UPDATE items SET on_sale_now = ? WHERE id = ?",
+        (1 if on_sale else 0, item_id)
+    )
+
 def add_price_record(item_id, price, regular_price=None, on_sale=False):
+    with transaction() as (conn, is_postgres):
+        _add_price_record(conn, is_postgres, item_id, price, regular_price, on_sale)
+    _invalidate_items_snapshot()
+
+def add_price_records_bulk(records):
+    """Insert many price records in one transaction.
+
+    records is a list of (item_id, price, regular_price, on_sale) tuples.
+    Batch callers (the check-all scrape) otherwise pay one commit - and on
+    SQLite one fsync - per item; executemany under a single commit turns
+    that into one write transaction.
+    """
+    if not records:
+        return
+    rows = [(r[0], r[1], r[2], 1 if r[3] else 0) for r in records]
+    query = """INSERT INTO price_history (item_id, price, regular_price, on_sale)
+               VALUES (?, ?, ?, ?)"""
+    # Last record per item wins for the denormalized sale flag
+    flags = {r[0]: r[3] for r in rows}
+    flag_query = "UPDATE items SET on_sale_now = ? WHERE id = ?"
     with get_db() as (conn, is_postgres):
-        execute_query(conn, is_postgres,
-            """INSERT INTO price_history (item_id, price, regular_price, on_sale)
-               VALUES (?, ?, ?, ?)""",
-            (item_id, price, regular_price, 1 if on_sale else 0)
-        )
+        cursor = conn.cursor()
+        if is_postgres:
+            # execute_values folds the whole batch into one INSERT
+            # statement, unlike executemany's one round-trip per row
+            import psycopg2.extras
+            psycopg2.extras.execute_values(cursor,
+                """INSERT INTO price_history (item_id, price, regular_price, on_sale)
+                   VALUES %s""",
+                rows, page_size=500)
+            cursor.executemany(_pg_translate(flag_query),
+                               [(f, i) for i, f in flags.items()])
+        else:
+            cursor.executemany(query, rows)
+            cursor.executemany(flag_query, [(f, i) for i, f in flags.items()])
         conn.commit()
+    _invalidate_items_snapshot()
 
 def get_price_history(item_id, limit=30):
     with get_db() as (conn, is_postgres):
@@ -509,16 +1146,35 @@ def get_sale_items():
         cursor = execute_query(conn, is_postgres, """
             SELECT i.*, ph.price, ph.regular_price, ph.on_sale
             FROM items i
-            JOIN price_history ph ON ph.id = (
-                SELECT id FROM price_history
-                WHERE item_id = i.id
-                ORDER BY checked_at DESC
-                LIMIT 1
-            )
-            WHERE ph.on_sale = 1 AND i.on_list = 1
+            JOIN (
+                SELECT item_id, price, regular_price, on_sale,
+                       ROW_NUMBER() OVER (PARTITION BY item_id
+                           ORDER BY checked_at DESC, id DESC) AS rn
+                FROM price_history
+            ) ph ON ph.item_id = i.id AND ph.rn = 1
+            WHERE i.on_sale_now = 1 AND i.on_list = 1
         """)
         return fetchall_as_dicts(cursor, is_postgres)
 
+# Users and stores change rarely but are read on nearly every list render
+# to resolve names; keep their lists cached the same way as the items
+# snapshot, dropped by the write helpers below.
+_users_snapshot = None
+_users_snapshot_time = 0.0
+_stores_snapshot = None
+_stores_snapshot_time = 0.0
+_ref_lock = threading.Lock()
+
+def _invalidate_users_snapshot():
+    global _users_snapshot
+    with _ref_lock:
+        _users_snapshot = None
+
+def _invalidate_stores_snapshot():
+    global _stores_snapshot
+    with _ref_lock:
+        _stores_snapshot = None
+
 # User management
 def add_user(name):
     with get_db() as (conn, is_postgres):
@@ -527,24 +1183,42 @@ def add_user(name):
             (name,)
         )
         conn.commit()
-        if is_postgres:
-            return cursor.fetchone()['id']
-        return cursor.lastrowid
+        user_id = cursor.fetchone()['id'] if is_postgres else cursor.lastrowid
+    _invalidate_users_snapshot()
+    return user_id
 
 def get_all_users():
+    global _users_snapshot, _users_snapshot_time
+    with _ref_lock:
+        if (_users_snapshot is not None
+                and time.monotonic() - _users_snapshot_time < _SNAPSHOT_TTL):
+            return _users_snapshot
     with get_db() as (conn, is_postgres):
         cursor = execute_query(conn, is_postgres, "SELECT * FROM users ORDER BY name")
-        return fetchall_as_dicts(cursor, is_postgres)
+        users = fetchall_as_dicts(cursor, is_postgres)
+    with _ref_lock:
+        _users_snapshot = users
+        _users_snapshot_time = time.monotonic()
+    return users
 
 def delete_user(user_id):
     with get_db() as (conn, is_postgres):
-        execute_query(conn, is_postgres, "DELETE FROM users WHERE id = ?", (user_id,))
-        conn.commit()
+        # References to users carry no ON DELETE action, so detach them
+        # first; with foreign keys enforced a bare DELETE would fail
+        with conn:
+            execute_query(conn, is_postgres, "UPDATE items SET added_by = NULL WHERE added_by = ?", (user_id,))
+            execute_query(conn, is_postgres, "UPDATE purchases SET user_id = NULL WHERE user_id = ?", (user_id,))
+            execute_query(conn, is_postgres, "UPDATE store_history SET changed_by = NULL WHERE changed_by = ?", (user_id,))
+            execute_query(conn, is_postgres, "DELETE FROM users WHERE id = ?", (user_id,))
+    _invalidate_users_snapshot()
+    _invalidate_items_snapshot()
 
 def update_user(user_id, name):
     with get_db() as (conn, is_postgres):
         execute_query(conn, is_postgres, "UPDATE users SET name = ? WHERE id = ?", (name, user_id))
         conn.commit()
+    _invalidate_users_snapshot()
+    _invalidate_items_snapshot()
 
 # Store management
 def add_store(name):
@@ -554,42 +1228,86 @@ def add_store(name):
             (name,)
         )
         conn.commit()
-        if is_postgres:
-            return cursor.fetchone()['id']
-        return cursor.lastrowid
+        store_id = cursor.fetchone()['id'] if is_postgres else cursor.lastrowid
+    _invalidate_stores_snapshot()
+    return store_id
 
 def get_all_stores():
+    global _stores_snapshot, _stores_snapshot_time
+    with _ref_lock:
+        if (_stores_snapshot is not None
+                and time.monotonic() - _stores_snapshot_time < _SNAPSHOT_TTL):
+            return _stores_snapshot
     with get_db() as (conn, is_postgres):
         cursor = execute_query(conn, is_postgres, "SELECT * FROM stores ORDER BY name")
-        return fetchall_as_dicts(cursor, is_postgres)
+        stores = fetchall_as_dicts(cursor, is_postgres)
+    with _ref_lock:
+        _stores_snapshot = stores
+        _stores_snapshot_time = time.monotonic()
+    return stores
 
 def delete_store(store_id):
     with get_db() as (conn, is_postgres):
-        execute_query(conn, is_postgres, "DELETE FROM stores WHERE id = ?", (store_id,))
-        conn.commit()
+        with conn:
+            execute_query(conn, is_postgres, "UPDATE items SET store_id = NULL WHERE store_id = ?", (store_id,))
+            execute_query(conn, is_postgres, "UPDATE store_history SET from_store_id = NULL WHERE from_store_id = ?", (store_id,))
+            execute_query(conn, is_postgres, "UPDATE store_history SET to_store_id = NULL WHERE to_store_id = ?", (store_id,))
+            execute_query(conn, is_postgres, "DELETE FROM stores WHERE id = ?", (store_id,))
+    _invalidate_stores_snapshot()
+    _invalidate_items_snapshot()
 
 def update_store(store_id, name):
     with get_db() as (conn, is_postgres):
         execute_query(conn, is_postgres, "UPDATE stores SET name = ? WHERE id = ?", (name, store_id))
         conn.commit()
+    _invalidate_stores_snapshot()
+    _invalidate_items_snapshot()
+
+# Async facade -----------------------------------------------------------
+# The async scrape route needs DB access without stalling the event loop.
+# Rather than maintaining a parallel aiosqlite pool, these wrap the pooled
+# sync helpers in asyncio.to_thread: each worker thread checks out its own
+# connection, so concurrent awaits don't contend on one handle.
+
+async def get_all_items_async():
+    return await asyncio.to_thread(get_all_items)
+
+async def get_items_with_urls_async():
+    return await asyncio.to_thread(get_items_with_urls)
+
+async def add_price_record_async(item_id, price, regular_price=None, on_sale=False):
+    return await asyncio.to_thread(add_price_record, item_id, price, regular_price, on_sale)
+
+async def add_price_records_bulk_async(records):
+    return await asyncio.to_thread(add_price_records_bulk, records)
+
+def _change_item_store(conn, is_postgres, item_id, new_store_id, changed_by=None):
+    """Statements only - no commit; run inside transaction()"""
+    if not is_postgres:
+        # The SELECT below would open a read transaction that the later
+        # writes must upgrade - a SQLITE_BUSY race under concurrency.
+        # BEGIN IMMEDIATE takes the write lock up front instead.
+        conn.execute("BEGIN IMMEDIATE")
+
+    # Get current store
+    cursor = execute_query(conn, is_postgres, "SELECT store_id FROM items WHERE id = ?", (item_id,))
+    current = fetchone_as_dict(cursor, is_postgres)
+    from_store_id = current['store_id'] if current else None
+
+    # Log the change
+    execute_query(conn, is_postgres,
+        "INSERT INTO store_history (item_id, from_store_id, to_store_id, changed_by) VALUES (?, ?, ?, ?)",
+        (item_id, from_store_id, new_store_id, changed_by)
+    )
+
+    # Update the item
+    execute_query(conn, is_postgres, "UPDATE items SET store_id = ? WHERE id = ?", (new_store_id, item_id))
 
 def change_item_store(item_id, new_store_id, changed_by=None):
     """Change item's store and log the change"""
-    with get_db() as (conn, is_postgres):
-        # Get current store
-        cursor = execute_query(conn, is_postgres, "SELECT store_id FROM items WHERE id = ?", (item_id,))
-        current = fetchone_as_dict(cursor, is_postgres)
-        from_store_id = current['store_id'] if current else None
-
-        # Log the change
-        execute_query(conn, is_postgres,
-            "INSERT INTO store_history (item_id, from_store_id, to_store_id, changed_by) VALUES (?, ?, ?, ?)",
-            (item_id, from_store_id, new_store_id, changed_by)
-        )
-
-        # Update the item
-        execute_query(conn, is_postgres, "UPDATE items SET store_id = ? WHERE id = ?", (new_store_id, item_id))
-        conn.commit()
+    with transaction() as (conn, is_postgres):
+        _change_item_store(conn, is_postgres, item_id, new_store_id, changed_by)
+    _invalidate_items_snapshot()
 
 def get_store_history(item_id):
     """Get store change history for an item"""
@@ -613,6 +1331,8 @@ def set_target_frequency(item_id, days):
     with get_db() as (conn, is_postgres):
         execute_query(conn, is_postgres, "UPDATE items SET target_frequency = ? WHERE id = ?", (days, item_id))
         conn.commit()
+    _invalidate_items_snapshot()
+    _bump_freq_epoch()
 
 if __name__ == "__main__":
     init_db()
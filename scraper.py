@@ -1,10 +1,97 @@
+import atexit
+import json
+import logging
+import os
 import re
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urlsplit
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml parses with C code several times faster than the pure-Python
+# html.parser; fall back gracefully where it isn't installed
+try:
+    import lxml  # noqa: F401
+    _BS_PARSER = 'lxml'
+except ImportError:
+    _BS_PARSER = 'html.parser'
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+log = logging.getLogger(__name__)
+
+# Compiled once: these run for every scraped page. The page-wide
+# fallback has a bytes twin so it can scan raw response bodies without
+# forcing a full UTF-8 decode first.
+_PRICE_RE = re.compile(r'\$?(\d[\d,]*\.?\d*)')
+_PAGE_PRICE_RE = re.compile(r'\$(\d+\.?\d*)')
+_PAGE_PRICE_BRE = re.compile(rb'\$(\d+\.?\d*)')
+_PRICE_CLASS_RE = re.compile('price')
+
+# How far into the page the last-ditch price regex may scan (bytes or
+# characters depending on input)
+_FALLBACK_SCAN_LIMIT = 256 * 1024
+
+# A real product page is HTML and nowhere near this big; anything else
+# is rejected from the response headers before the body is downloaded
+_MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+# JSON-LD product blocks; script tags aren't in the strained parse
+# tree, so these are pulled straight from the raw body
+_LDJSON_RE = re.compile(
+    r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.S | re.I)
+_LDJSON_BRE = re.compile(
+    rb'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.S | re.I)
+
+def _ldjson_price(html):
+    """Pull (offers.price, product name) from embedded JSON-LD, or
+    (None, None) when the page carries none"""
+    pattern = _LDJSON_BRE if isinstance(html, bytes) else _LDJSON_RE
+    for block in pattern.finditer(html):
+        try:
+            data = json.loads(block.group(1))
+        except (ValueError, UnicodeDecodeError):
+            continue
+        for node in data if isinstance(data, list) else [data]:
+            if not isinstance(node, dict):
+                continue
+            offers = node.get('offers')
+            if isinstance(offers, list) and offers:
+                offers = offers[0]
+            if not isinstance(offers, dict):
+                continue
+            price = offers.get('price')
+            if price is None and isinstance(offers.get('priceSpecification'), dict):
+                price = offers['priceSpecification'].get('price')
+            try:
+                if price is not None:
+                    return float(price), node.get('name')
+            except (TypeError, ValueError):
+                continue
+    return None, None
+
+# The three Amazon price locations in priority order: buybox offscreen
+# text, legacy priceblock, then any a-price span as a last resort. Probed
+# one at a time - a comma union would return whichever matches first in
+# document order, and pages routinely put other-sellers or strikethrough
+# a-price blocks above the buybox.
+_AMAZON_PRICE_SELECTORS = ('#corePrice_feature_div .a-offscreen',
+                           '#priceblock_ourprice',
+                           '.a-price .a-offscreen')
+
+# Every selector below targets one of these tags, so tell BeautifulSoup
+# to build tree nodes only for them: script/style bodies, navigation,
+# images and the rest of the page never become Python objects
+_PARSE_ONLY = SoupStrainer(('h1', 'span', 'div', 'p', 'b', 'strong'))
+
+# slots: no per-instance __dict__, which matters when a batch sweep
+# holds one of these per item. frozen: results are shared via the URL
+# cache, so nobody should mutate them after construction anyway.
+@dataclass(slots=True, frozen=True)
 class PriceInfo:
     price: Optional[float]
     regular_price: Optional[float]
@@ -16,10 +103,15 @@ def extract_price(price_text: str) -> Optional[float]:
     """Extract numeric price from text like '$4.99' or '4.99/lb'"""
     if not price_text:
         return None
-    match = re.search(r'\$?([\d,]+\.?\d*)', price_text.replace(',', ''))
+    match = _PRICE_RE.search(price_text)
     if match:
+        number = match.group(1)
+        # Thousands separators are rare in grocery prices; skip the
+        # copy entirely when there are none
+        if ',' in number:
+            number = number.replace(',', '')
         try:
-            return float(match.group(1))
+            return float(number)
         except ValueError:
             return None
     return None
@@ -28,37 +120,97 @@ def is_valid_url(url: str) -> bool:
     """Check if URL is a valid Whole Foods or Amazon Whole Foods URL"""
     if not url:
         return False
-    url_lower = url.lower()
-    return 'wholefoodsmarket.com' in url_lower or ('amazon.com' in url_lower and 'wholefoods' in url_lower)
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    # Match on the parsed hostname rather than substring-scanning the
+    # whole lowercased URL; also rejects lookalike hosts like
+    # wholefoodsmarket.com.evil.example
+    host = (parts.hostname or '').lower()
+    if host == 'wholefoodsmarket.com' or host.endswith('.wholefoodsmarket.com'):
+        return True
+    if host == 'amazon.com' or host.endswith('.amazon.com'):
+        return 'wholefoods' in parts.path.lower()
+    return False
 
-def scrape_whole_foods_price(url: str) -> PriceInfo:
-    """
-    Scrape price information from a Whole Foods or Amazon Whole Foods product page.
-    Returns PriceInfo with current price, regular price, and sale status.
-    """
-    if not is_valid_url(url):
-        return PriceInfo(
-            price=None,
-            regular_price=None,
-            on_sale=False,
-            product_name=None,
-            error="Invalid URL. Use a wholefoodsmarket.com or Amazon Whole Foods URL"
-        )
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# One shared session so TCP+TLS handshakes are reused across scrapes
+# instead of renegotiated per request; pool sized to cover the thread
+# pool's maximum fan-out
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+_adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+# Tear the pooled sockets down cleanly on interpreter exit rather than
+# leaving them to be reset by the peer
+atexit.register(SESSION.close)
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
+# Recent successful scrapes, keyed by URL: grocery prices don't move
+# minute to minute, so back-to-back checks of the same item (manual
+# refresh right after a batch run, say) reuse the result instead of
+# re-fetching the page
+_SCRAPE_TTL = 1800
+_scrape_cache = {}
+_scrape_cache_lock = threading.Lock()
 
+def _cached_price_info(url):
+    with _scrape_cache_lock:
+        entry = _scrape_cache.get(url)
+    if entry and time.monotonic() - entry[0] < _SCRAPE_TTL:
+        return entry[1]
+    return None
+
+def _store_price_info(url, info):
+    if info.error is None:
+        with _scrape_cache_lock:
+            _scrape_cache[url] = (time.monotonic(), info)
+
+# Politeness spacing, per host: concurrent workers hitting the same
+# origin reserve staggered start slots instead of landing all at once.
+# Unrelated hosts never wait on each other.
+_HOST_INTERVAL = 2.0
+_host_next = {}
+_host_lock = threading.Lock()
+
+def _reserve_host_slot(url):
+    """Return how long the caller should wait before fetching url"""
+    host = (urlsplit(url).hostname or '').lower()
+    with _host_lock:
+        now = time.monotonic()
+        start = max(now, _host_next.get(host, 0.0))
+        _host_next[host] = start + _HOST_INTERVAL
+    return start - now
+
+def _preflight_reject(content_type, content_length):
+    """Reason to skip parsing this response, judged from headers alone,
+    or None if it looks like a product page"""
+    if content_type and 'html' not in content_type:
+        return f"Not a product page (content-type {content_type.split(';')[0]})"
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        if content_length and int(content_length) > _MAX_PAGE_BYTES:
+            return "Page too large to be a product page"
+    except ValueError:
+        pass
+    return None
 
-        soup = BeautifulSoup(response.text, 'html.parser')
+def parse_product_page(url: str, html) -> PriceInfo:
+    """Extract price information from a fetched product page.
+
+    Accepts the body as bytes or str; BeautifulSoup sniffs the encoding
+    itself, so callers can hand over the raw response without decoding.
+    """
+    try:
+        soup = BeautifulSoup(html, _BS_PARSER, parse_only=_PARSE_ONLY)
 
         is_amazon = 'amazon.com' in url.lower()
         price = None
@@ -72,48 +224,52 @@ def scrape_whole_foods_price(url: str) -> PriceInfo:
             if title_elem:
                 product_name = title_elem.get_text().strip()
 
-            # Try multiple price selectors for Amazon
-            # Method 1: Look for price in corePrice section
-            core_price = soup.find('div', {'id': 'corePrice_feature_div'})
-            if core_price:
-                price_span = core_price.find('span', {'class': 'a-offscreen'})
-                if price_span:
-                    price = extract_price(price_span.get_text())
-
-            # Method 2: Look for apex price
-            if not price:
-                apex_price = soup.find('span', {'id': 'priceblock_ourprice'})
-                if apex_price:
-                    price = extract_price(apex_price.get_text())
+            # Methods 1-3: the known price locations, most trustworthy
+            # first, stopping at the first one that yields a price
+            for selector in _AMAZON_PRICE_SELECTORS:
+                price_elem = soup.select_one(selector)
+                if price_elem:
+                    price = extract_price(price_elem.get_text())
+                    if price:
+                        break
 
-            # Method 3: Look for any a-price span
+            # Structured data survives markup A/B tests that break the
+            # selectors above; try it before the blind regex scan
             if not price:
-                price_elem = soup.find('span', {'class': 'a-price'})
-                if price_elem:
-                    offscreen = price_elem.find('span', {'class': 'a-offscreen'})
-                    if offscreen:
-                        price = extract_price(offscreen.get_text())
+                price, ld_name = _ldjson_price(html)
+                if ld_name and not product_name:
+                    product_name = ld_name
 
-            # Method 4: Search for price pattern in page
+            # Method 4: Search for price pattern in page. Raw bytes go
+            # through the bytes regex, sparing the str decode of a page
+            # that's only needed for this last-ditch scan. The scan is
+            # capped: a real price appears near the top of the buybox
+            # markup, and past that the regex only finds noise (related
+            # items, reviews) at O(page size) cost.
             if not price:
-                # Look for price in the whole page text
-                price_pattern = re.search(r'\$(\d+\.?\d*)', response.text)
+                head = html[:_FALLBACK_SCAN_LIMIT]
+                if isinstance(head, bytes):
+                    price_pattern = _PAGE_PRICE_BRE.search(head)
+                else:
+                    price_pattern = _PAGE_PRICE_RE.search(head)
                 if price_pattern:
                     price = float(price_pattern.group(1))
 
-            # Check for sale
-            was_price = soup.find('span', {'class': 'a-text-price'})
-            if was_price:
-                was_offscreen = was_price.find('span', {'class': 'a-offscreen'})
-                if was_offscreen:
-                    regular = extract_price(was_offscreen.get_text())
-                    if regular and price and regular > price:
-                        on_sale = True
-                        regular_price = regular
+            # Check for sale: one descendant selector instead of a find
+            # for the strikethrough span plus a second find inside it
+            was_offscreen = soup.select_one('.a-text-price .a-offscreen')
+            if was_offscreen:
+                regular = extract_price(was_offscreen.get_text())
+                if regular and price and regular > price:
+                    on_sale = True
+                    regular_price = regular
 
-            savings = soup.find('span', {'class': 'savingsPercentage'})
-            if savings:
-                on_sale = True
+            # Secondary sale signal; skip the tree walk when the
+            # was-price already settled it
+            if not on_sale:
+                savings = soup.find('span', {'class': 'savingsPercentage'})
+                if savings:
+                    on_sale = True
 
         else:
             # Whole Foods Market website
@@ -126,10 +282,17 @@ def scrape_whole_foods_price(url: str) -> PriceInfo:
                 price = extract_price(price_elem.get_text())
 
             if not price:
-                price_elem = soup.find(class_=re.compile('price'))
+                price_elem = soup.find(class_=_PRICE_CLASS_RE)
                 if price_elem:
                     price = extract_price(price_elem.get_text())
 
+            # Whole Foods pages expose JSON-LD too; same last resort
+            # before giving up
+            if not price:
+                price, ld_name = _ldjson_price(html)
+                if ld_name and not product_name:
+                    product_name = ld_name
+
         if price is None:
             return PriceInfo(
                 price=None,
@@ -147,6 +310,58 @@ def scrape_whole_foods_price(url: str) -> PriceInfo:
             error=None
         )
 
+    except Exception as e:
+        return PriceInfo(
+            price=None,
+            regular_price=None,
+            on_sale=False,
+            product_name=None,
+            error=f"Failed to scrape: {str(e)}"
+        )
+
+def scrape_whole_foods_price(url: str, use_cache: bool = True) -> PriceInfo:
+    """
+    Scrape price information from a Whole Foods or Amazon Whole Foods product page.
+    Returns PriceInfo with current price, regular price, and sale status.
+    Results fresher than _SCRAPE_TTL are served from cache unless
+    use_cache=False forces a refetch.
+    """
+    if use_cache:
+        cached = _cached_price_info(url)
+        if cached is not None:
+            return cached
+
+    if not is_valid_url(url):
+        return PriceInfo(
+            price=None,
+            regular_price=None,
+            on_sale=False,
+            product_name=None,
+            error="Invalid URL. Use a wholefoodsmarket.com or Amazon Whole Foods URL"
+        )
+
+    delay = _reserve_host_slot(url)
+    if delay > 0:
+        time.sleep(delay)
+
+    try:
+        # (connect, read) split: a host that won't answer the handshake
+        # fails in 5s instead of holding a worker for the full 15s.
+        # stream=True defers the body so the header checks below can
+        # reject bad responses before any of it is downloaded.
+        with SESSION.get(url, timeout=(5, 15), stream=True) as response:
+            response.raise_for_status()
+            reject = _preflight_reject(response.headers.get('Content-Type'),
+                                       response.headers.get('Content-Length'))
+            if reject:
+                return PriceInfo(
+                    price=None,
+                    regular_price=None,
+                    on_sale=False,
+                    product_name=None,
+                    error=reject
+                )
+            body = response.content
     except requests.RequestException as e:
         return PriceInfo(
             price=None,
@@ -155,37 +370,169 @@ def scrape_whole_foods_price(url: str) -> PriceInfo:
             product_name=None,
             error=f"Failed to fetch page: {str(e)}"
         )
-    except Exception as e:
+
+    # Hand over the raw bytes: skips the eager full-page decode, which
+    # the parser only needs lazily (if at all) for the regex fallback
+    info = parse_product_page(url, body)
+    _store_price_info(url, info)
+    return info
+
+async def scrape_whole_foods_price_async(session, url: str, use_cache: bool = True) -> PriceInfo:
+    """Async variant of scrape_whole_foods_price using a shared aiohttp session"""
+    import asyncio
+    import aiohttp
+
+    if use_cache:
+        cached = _cached_price_info(url)
+        if cached is not None:
+            return cached
+
+    if not is_valid_url(url):
         return PriceInfo(
             price=None,
             regular_price=None,
             on_sale=False,
             product_name=None,
-            error=f"Failed to scrape: {str(e)}"
+            error="Invalid URL. Use a wholefoodsmarket.com or Amazon Whole Foods URL"
         )
 
-def check_all_prices(items: list) -> dict:
+    delay = _reserve_host_slot(url)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    try:
+        async with session.get(url, headers=HEADERS,
+                               timeout=aiohttp.ClientTimeout(total=15, connect=5)) as response:
+            response.raise_for_status()
+            reject = _preflight_reject(response.headers.get('Content-Type'),
+                                       response.headers.get('Content-Length'))
+            if reject:
+                return PriceInfo(
+                    price=None,
+                    regular_price=None,
+                    on_sale=False,
+                    product_name=None,
+                    error=reject
+                )
+            html = await response.read()
+    # TimeoutError is not a ClientError: without it one stalled URL
+    # would escape the gather and sink the whole batch
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return PriceInfo(
+            price=None,
+            regular_price=None,
+            on_sale=False,
+            product_name=None,
+            error=f"Failed to fetch page: {str(e)}"
+        )
+
+    # Parsing is CPU-bound; push it to the default executor so it doesn't
+    # stall the event loop between fetches
+    info = await asyncio.get_running_loop().run_in_executor(
+        None, parse_product_page, url, html)
+    _store_price_info(url, info)
+    return info
+
+async def check_all_prices_async(items: list, limit: int = 20) -> dict:
+    """
+    Async counterpart to check_all_prices: fetches every item's page over a
+    single shared aiohttp connection pool, with a semaphore bounding how
+    many scrapes are in flight so the origin isn't hammered. Returns a
+    dict mapping item_id to PriceInfo.
+    """
+    # Lazy import so the sync path works without aiohttp installed
+    import asyncio
+    import aiohttp
+
+    items = [item for item in items if item.get('whole_foods_url')]
+    if not items:
+        return {}
+
+    sem = asyncio.Semaphore(limit)
+
+    async def bounded(item):
+        async with sem:
+            return await scrape_whole_foods_price_async(session, item['whole_foods_url'])
+
+    # Cache DNS lookups and cap per-host sockets so one slow origin
+    # can't soak up the whole connection budget
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=8,
+                                     ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        infos = await asyncio.gather(*[bounded(item) for item in items])
+
+    results = {item['id']: info for item, info in zip(items, infos)}
+    ok = sum(1 for info in results.values() if info.price is not None)
+    log.info('checked %d prices (%d found)', len(results), ok)
+    return results
+
+def default_worker_count() -> int:
+    """Size the scrape pool from the CPUs actually available to this process"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        cpus = os.cpu_count() or 1
+    return min(8, cpus * 5)
+
+def check_all_prices(items: list, max_workers: int = None) -> dict:
     """
     Check prices for a list of items with Whole Foods URLs.
-    Returns a dict mapping item_id to PriceInfo.
+    Scrapes run concurrently on a small thread pool since each one is a
+    blocking network round-trip; the pool stays small to be polite to the
+    servers. Returns a dict mapping item_id to PriceInfo.
     """
-    import time
+    items = [item for item in items if item.get('whole_foods_url')]
+    if not items:
+        return {}
+
+    if max_workers is None:
+        max_workers = default_worker_count()
+
     results = {}
-    for item in items:
-        if item.get('whole_foods_url'):
-            print(f"Checking price for: {item['name']}")
-            results[item['id']] = scrape_whole_foods_price(item['whole_foods_url'])
-            time.sleep(2)  # Be polite to the server
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(scrape_whole_foods_price, item['whole_foods_url']): item
+            for item in items
+        }
+        for future in as_completed(futures):
+            item = futures[future]
+            results[item['id']] = future.result()
+
+    ok = sum(1 for info in results.values() if info.price is not None)
+    log.info('checked %d prices (%d found)', len(results), ok)
     return results
 
+def run_price_check():
+    """Check and record all prices - run from cron: python scraper.py check-all
+
+    Runs in its own process so scrapes never contend with the web server
+    for the interpreter; WAL mode makes the SQLite file safe to share.
+    """
+    import database as db
+    db.init_db()
+    items = db.get_items_with_urls()
+    results = check_all_prices(items)
+    records = [
+        (item_id, result.price, result.regular_price, result.on_sale)
+        for item_id, result in results.items()
+        if result.price is not None
+    ]
+    db.add_price_records_bulk(records)
+    print(f"Recorded {len(records)} of {len(results)} prices")
+
 if __name__ == "__main__":
-    test_url = input("Enter a Whole Foods product URL to test: ").strip()
-    if test_url:
-        print("Scraping...")
-        result = scrape_whole_foods_price(test_url)
-        print(f"\nProduct: {result.product_name}")
-        print(f"Price: ${result.price}")
-        print(f"Regular Price: ${result.regular_price}")
-        print(f"On Sale: {result.on_sale}")
-        if result.error:
-            print(f"Error: {result.error}")
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "check-all":
+        logging.basicConfig(level=logging.INFO)
+        run_price_check()
+    else:
+        test_url = input("Enter a Whole Foods product URL to test: ").strip()
+        if test_url:
+            print("Scraping...")
+            result = scrape_whole_foods_price(test_url)
+            print(f"\nProduct: {result.product_name}")
+            print(f"Price: ${result.price}")
+            print(f"Regular Price: ${result.regular_price}")
+            print(f"On Sale: {result.on_sale}")
+            if result.error:
+                print(f"Error: {result.error}")
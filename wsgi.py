@@ -0,0 +1,5 @@
+"""Production entrypoint: gunicorn -w 2 -k gthread --threads 8 --timeout 120 wsgi:app"""
+from app import app
+
+if __name__ == "__main__":
+    app.run()